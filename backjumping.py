@@ -0,0 +1,233 @@
+import collections
+
+from propagation import CELL, GROUP, Conflict
+
+# Levels of a failure whose cause is unknown, or of a subtree that found a
+# solution: every level, so the search goes back one level at a time.
+ALL_LEVELS = -1
+MAX_NOGOODS = 1000
+
+
+class NogoodStore:
+    """Bounded store of learned nogoods.
+
+    A nogood is a frozenset of `(cell, value)` pairs that no solution holds
+    all of. Every pair is indexed, so the nogoods a new assignment can
+    complete are found by lookup. Once `limit` nogoods are stored, adding one
+    evicts the one that was added or matched least recently.
+    """
+
+    def __init__(self, limit=MAX_NOGOODS):
+        self.limit = limit
+        self._nogoods = collections.OrderedDict()
+        self._index = collections.defaultdict(set)
+
+    def __len__(self):
+        return len(self._nogoods)
+
+    def add(self, nogood):
+        if nogood in self._nogoods:
+            self._nogoods.move_to_end(nogood)
+            return
+        if len(self._nogoods) >= self.limit:
+            old, _ = self._nogoods.popitem(last=False)
+            for pair in old:
+                watching = self._index[pair]
+                watching.discard(old)
+                if not watching:
+                    del self._index[pair]
+        self._nogoods[nogood] = None
+        for pair in nogood:
+            self._index[pair].add(nogood)
+
+    def find(self, cells, get_state):
+        """A stored nogood the board holds that involves `cells`, or None."""
+        for cell in cells:
+            for nogood in self._index.get((cell, get_state(cell)), ()):
+                if all(get_state(c) == value for c, value in nogood):
+                    self._nogoods.move_to_end(nogood)
+                    return nogood
+        return None
+
+
+class BackjumpingMixin:
+    """Conflict-directed backjumping with learned nogoods.
+
+    Every cell set by the search depends on a set of levels, kept as a bit
+    mask in `_deps`: a branch assigned at depth `d` depends on level `d`,
+    and a deduced cell on the levels of the filled cells its rule looked at.
+    A rule only looks at the pocket of empty cells around the cell or group
+    it ran for, so those are the cells bordering the pockets, the regions
+    they belong to and the cells bordering these regions. An exclusion
+    depends on the levels of the failure that caused it, minus its own.
+
+    A contradiction raised as a `Conflict` names its cause, and the levels
+    of that cause are the conflict set of the failed branch. A branch whose
+    conflict set leaves out its own level failed for reasons decided higher
+    up, so the search jumps back to the deepest level of the set instead of
+    trying the remaining branches. When every branch of a node fails, the
+    decisions at the levels of their union, plus the levels that ruled out
+    any other branch, are a nogood, which goes into a `NogoodStore` and
+    stops the search as soon as it is repeated. Nogoods only hold for the
+    board a search started from, so every search gets a new store.
+
+    Any other `ValueError`, and a subtree where a solution was found while
+    counting, depends on every level, which backtracks one level at a time.
+    """
+
+    backjumping = False
+    backjumps = 0
+    nogood_hits = 0
+    nogoods = None
+    _deps = None
+
+    def _start_backjumping(self):
+        if not self.backjumping:
+            self._deps = None
+            return
+        self._deps = {}
+        self._decisions = []
+        self._exclusion_levels = collections.defaultdict(dict)
+        self._reason_cache = (None, 0)
+        self.nogoods = NogoodStore()
+
+    def _stop_backjumping(self):
+        self._deps = None
+
+    def _decide(self, cell, value, depth):
+        if self._deps is not None:
+            self._deps[cell] = 1 << depth
+            del self._decisions[depth:]
+            self._decisions.append((cell, value))
+
+    def _record_deduction(self, cell):
+        reason, levels = self._reason_cache
+        if reason is not self._reason:
+            levels = self._reason_levels(*self._reason)
+            self._reason_cache = (self._reason, levels)
+        self._deps[cell] = levels
+
+    def _exclude_after(self, excluded, cell, value, levels, depth):
+        self._exclude(excluded, cell, value)
+        if self._deps is not None:
+            self._exclusion_levels[cell][value] = levels & ~(1 << depth)
+
+    def _include_back(self, excluded, cell, value):
+        self._include(excluded, cell, value)
+        if self._deps is not None:
+            del self._exclusion_levels[cell][value]
+
+    def _conflict_levels(self, error):
+        if self._deps is None or not isinstance(error, Conflict):
+            return ALL_LEVELS
+        levels = 0
+        for cell in error.cells:
+            levels |= self._deps.get(cell, 0)
+        cached_reason, cached_levels = self._reason_cache
+        for reason in error.reasons:
+            if reason is cached_reason:
+                levels |= cached_levels
+            else:
+                levels |= self._reason_levels(*reason)
+        for cell, value in error.exclusions:
+            levels |= self._exclusion_levels[cell].get(value, 0)
+        return levels
+
+    def _branch_levels(self, reason):
+        """Levels that make the branches of a node the only ones."""
+        if self._deps is None:
+            return ALL_LEVELS
+        kind, item = reason
+        levels = self._reason_levels(kind, item)
+        if kind == GROUP:
+            value = item.get_value()
+            for cell in item.initial_cells:
+                for n in self.field_state.field.get_neighbour_cells(cell):
+                    levels |= self._exclusion_levels.get(n, {}).get(value, 0)
+        return levels
+
+    def _reason_levels(self, kind, item):
+        if kind == CELL:
+            levels = self._around_levels([item])
+            for cell_levels in self._exclusion_levels.get(item, {}).values():
+                levels |= cell_levels
+            return levels
+        neighbours = self.field_state.field.get_neighbour_cells
+        seeds = list(item.initial_cells)
+        seeds += [
+            n
+            for cell in item.initial_cells
+            for n in neighbours(cell)
+            if self.field_state.get_state(n) == 0
+        ]
+        return self._around_levels(seeds)
+
+    def _around_levels(self, seeds):
+        """Levels of the cells that decide the candidates around `seeds`.
+
+        Those are the filled seeds and the cells bordering the pockets of
+        the empty ones, with the regions of all these cells and the cells
+        bordering the regions.
+        """
+        levels = 0
+        for start in self._deciding_regions(seeds):
+            levels |= self._region_levels(start)
+        return levels
+
+    def _deciding_regions(self, seeds):
+        # A cell of each region, found once per region label.
+        state = self.field_state
+        seen = set()
+        regions = []
+        for seed in seeds:
+            label = state.get_region_id(seed)
+            if label in seen:
+                continue
+            seen.add(label)
+            if state.get_state(seed) != 0:
+                regions.append(seed)
+            else:
+                self._add_pocket_borders(seed, seen, regions)
+        return regions
+
+    def _add_pocket_borders(self, seed, seen, regions):
+        state = self.field_state
+        for cell in state.get_involved(seed):
+            for n in state.field.get_neighbour_cells(cell):
+                if state.get_state(n) != 0:
+                    label = state.get_region_id(n)
+                    if label not in seen:
+                        seen.add(label)
+                        regions.append(n)
+
+    def _region_levels(self, start):
+        """Levels of the region of `start` and of the cells bordering it."""
+        state = self.field_state
+        deps = self._deps
+        value = state.get_state(start)
+        levels = 0
+        for cell in state.get_involved(start):
+            levels |= deps.get(cell, 0)
+            for n in state.field.get_neighbour_cells(cell):
+                n_value = state.get_state(n)
+                if n_value != 0 and n_value != value:
+                    levels |= deps.get(n, 0)
+        return levels
+
+    def _learn(self, levels):
+        if self._deps is None or levels <= 0:
+            return
+        nogood = []
+        while levels:
+            low = levels & -levels
+            nogood.append(self._decisions[low.bit_length() - 1])
+            levels ^= low
+        self.nogoods.add(frozenset(nogood))
+
+    def _check_nogoods(self, assigned):
+        if self._deps is None:
+            return
+        nogood = self.nogoods.find(assigned, self.field_state.get_state)
+        if nogood is not None:
+            self.nogood_hits += 1
+            raise Conflict("Learned nogood", cells=[cell for cell, _ in nogood])
@@ -0,0 +1,390 @@
+"""Headless batch solving of every puzzle in a file.
+
+Usage: python batch.py [puzzle.json] [--workers N] [--timeout S]
+                       [--max-nodes N] [--engine ENGINE]
+                       [--output results.jsonl] [--cache solutions.db]
+                       [--stats]
+
+Puzzles are read lazily and solved on a process pool, and one JSON record
+per puzzle is written as soon as it finishes, so records come in completion
+order:
+
+    {"index": 3, "status": "solved", "time": 0.12, "solution": [[...], ...]}
+
+A puzzle whose solution, or that of a rotated or mirrored copy, is in the
+cache is answered without a worker and its record has `"cached": true`.
+With `--stats`, a record also has the `SolverStats` of its solve.
+
+`status` is one of `solved`, `unsolved`, `timeout`, `node_limit`, `error`
+or `crashed`. The backtracking engine stops its search at the timeout, or
+after `--max-nodes` search nodes, and the record then has the board as
+propagation left it before the search as `"partial"`. A worker that dies
+takes down the whole pool; the puzzles it was running are then retried
+one at a time, so only the one that crashes again is reported as
+`crashed`. A worker still busy well past the timeout is killed the same
+way.
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import IO, Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from cache import SolutionCache
+from constants import PUZZLE_FILE
+from reader import iter_puzzles
+from validation import is_solution
+
+SOLVED = "solved"
+UNSOLVED = "unsolved"
+TIMEOUT = "timeout"
+NODE_LIMIT = "node_limit"
+ERROR = "error"
+CRASHED = "crashed"
+
+# How long past its timeout a worker may stay busy before it is killed.
+KILL_GRACE = 5.0
+# How long past its timeout a backtracking search may run to hand back its
+# partial board before the alarm stops it.
+ALARM_GRACE = 1.0
+POLL_INTERVAL = 0.5
+
+Record = Dict[str, Any]
+Task = Tuple[int, List[List[int]]]
+
+
+class PuzzleTimeout(Exception):
+    pass
+
+
+def init_worker() -> None:
+    # Stdout carries the result stream; keep anything printed in a worker
+    # away from it.
+    sys.stdout = sys.stderr
+
+
+def pool_size(workers: Optional[int] = None) -> int:
+    """Processes of a pool asked for `workers`, by default one per CPU."""
+    return workers if workers is not None else os.cpu_count() or 1
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise PuzzleTimeout()
+
+
+def solve_one(
+    index: int,
+    matrix: List[List[int]],
+    engine: str,
+    timeout: Optional[float],
+    stats: bool = False,
+    max_nodes: Optional[int] = None,
+) -> Record:
+    """Solves one puzzle in a worker process and describes the outcome.
+
+    The backtracking engine gets `timeout` and `max_nodes` as the budget of
+    its search; the other engines ignore `max_nodes` and are stopped by an
+    alarm at the timeout.
+    """
+    from stats import SolverStats
+
+    use_alarm = _set_alarm(engine, timeout)
+    start = time.perf_counter()
+    record: Record = {"index": index}
+    solver_stats = SolverStats() if stats else None
+    try:
+        record.update(_solve(matrix, engine, timeout, max_nodes, solver_stats))
+    except PuzzleTimeout:
+        record["status"] = TIMEOUT
+    except Exception as e:
+        record["status"] = ERROR
+        record["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record["time"] = round(time.perf_counter() - start, 6)
+    if solver_stats is not None:
+        record["stats"] = solver_stats.as_dict()
+    return record
+
+
+def _set_alarm(engine: str, timeout: Optional[float]) -> bool:
+    """Arms the alarm that stops a solve; returns whether it was armed."""
+    from solver2 import BACKTRACKING
+
+    if timeout is None or not hasattr(signal, "setitimer"):
+        return False
+    if engine == BACKTRACKING:
+        timeout += ALARM_GRACE
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    return True
+
+
+def _solve(
+    matrix: List[List[int]],
+    engine: str,
+    timeout: Optional[float],
+    max_nodes: Optional[int],
+    solver_stats: Any,
+) -> Record:
+    """The status and board fields of the record of a solve."""
+    from solver2 import BACKTRACKING, FieldState, PuzzleSolver
+
+    state = FieldState.from_list_to_state(matrix)
+    solver = PuzzleSolver(state, stats=solver_stats)
+    if engine == BACKTRACKING:
+        result = solver.solve_within(max_nodes, timeout)
+        if result.status == SOLVED:
+            return {"status": SOLVED, "solution": result.board}
+        if result.status in (TIMEOUT, NODE_LIMIT):
+            return {"status": result.status, "partial": result.board}
+        return {"status": result.status}
+    if not solver.solve(engine=engine):
+        return {"status": UNSOLVED}
+    size = state.field.size()
+    solution = [[state.get_state((x, y)) for y in range(size)] for x in range(size)]
+    return {"status": SOLVED, "solution": solution}
+
+
+def _killed_record(index: int, status: str, started: float) -> Record:
+    return {
+        "index": index,
+        "status": status,
+        "time": round(time.monotonic() - started, 6),
+    }
+
+
+def kill_pool(executor: ProcessPoolExecutor) -> None:
+    for process in list(getattr(executor, "_processes", {}).values()):
+        process.terminate()
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run_batch(
+    puzzles: Iterable[List[List[int]]],
+    output: IO[str],
+    workers: Optional[int] = None,
+    timeout: Optional[float] = None,
+    engine: str = "backtracking",
+    cache: Optional[SolutionCache] = None,
+    stats: bool = False,
+    max_nodes: Optional[int] = None,
+) -> Dict[str, int]:
+    """Solves all puzzles, writing JSONL records; returns counts per status."""
+    return _BatchRun(
+        puzzles, output, workers, cache, engine, timeout, stats, max_nodes
+    ).run()
+
+
+class _BatchRun:
+    """The pool of one `run_batch` call and the puzzles it runs.
+
+    Every round submits what may run, collects the finished puzzles and
+    restarts the pool if a worker died or got stuck.
+    """
+
+    def __init__(
+        self,
+        puzzles: Iterable[List[List[int]]],
+        output: IO[str],
+        workers: Optional[int],
+        cache: Optional[SolutionCache],
+        engine: str,
+        timeout: Optional[float],
+        stats: bool,
+        max_nodes: Optional[int],
+    ) -> None:
+        self.tasks = iter(enumerate(puzzles))
+        self.output = output
+        self.workers = pool_size(workers)
+        self.cache = cache
+        self.engine = engine
+        self.timeout = timeout
+        self.stats = stats
+        self.max_nodes = max_nodes
+        self.suspects: Deque[Task] = deque()
+        self.counts: Dict[str, int] = {}
+        self.running: Dict[Any, Tuple[Task, float]] = {}
+        self.exhausted = False
+        self.executor = self._new_pool()
+
+    def run(self) -> Dict[str, int]:
+        try:
+            while self._schedule():
+                broken = self._collect()
+                stuck = self._stuck()
+                if broken or stuck:
+                    self._restart(broken, stuck)
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        return self.counts
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def _emit(self, record: Record) -> None:
+        self.counts[record["status"]] = self.counts.get(record["status"], 0) + 1
+        self.output.write(json.dumps(record) + "\n")
+        self.output.flush()
+
+    def _schedule(self) -> bool:
+        """Submits what may run now; returns whether anything is running."""
+        # Retried puzzles run alone, so a crash can be pinned on them.
+        if self.suspects:
+            if not self.running:
+                self._submit(self.suspects.popleft())
+        else:
+            while not self.exhausted and len(self.running) < self.workers:
+                self._submit_next()
+        return bool(self.running)
+
+    def _submit(self, task: Task) -> None:
+        index, matrix = task
+        future = self.executor.submit(
+            solve_one,
+            index,
+            matrix,
+            self.engine,
+            self.timeout,
+            self.stats,
+            self.max_nodes,
+        )
+        self.running[future] = (task, time.monotonic())
+
+    def _submit_next(self) -> None:
+        for task in self.tasks:
+            solution = self._cached(task[1])
+            if solution is None:
+                self._submit(task)
+                return
+            self._emit(
+                {
+                    "index": task[0],
+                    "status": SOLVED,
+                    "solution": solution,
+                    "time": 0.0,
+                    "cached": True,
+                }
+            )
+        self.exhausted = True
+
+    def _cached(self, puzzle: List[List[int]]) -> Optional[List[List[int]]]:
+        if self.cache is None:
+            return None
+        return self.cache.get(puzzle, self.engine)
+
+    def _collect(self) -> List[Tuple[Task, float]]:
+        """Emits the records of the finished puzzles; returns the ones a
+        broken pool lost."""
+        done, _ = wait(self.running, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+        broken = []
+        for future in done:
+            task, started = self.running.pop(future)
+            try:
+                record = future.result()
+            except BrokenProcessPool:
+                broken.append((task, started))
+                continue
+            self._cache_solution(task, record)
+            self._emit(record)
+        return broken
+
+    def _cache_solution(self, task: Task, record: Record) -> None:
+        # A solution is checked before it is cached, as an engine bug would
+        # otherwise be answered from the cache for good.
+        if self.cache is None or record["status"] != SOLVED:
+            return
+        if is_solution(task[1], record["solution"]):
+            self.cache.put(task[1], record["solution"], self.engine)
+
+    def _stuck(self) -> List[Any]:
+        if self.timeout is None:
+            return []
+        now = time.monotonic()
+        return [
+            future
+            for future, (_, started) in self.running.items()
+            if now - started > self.timeout + KILL_GRACE
+        ]
+
+    def _restart(self, broken: List[Tuple[Task, float]], stuck: List[Any]) -> None:
+        """Kills the pool, reporting the stuck puzzles as timed out.
+
+        The puzzles it was still running are retried one at a time, unless
+        the crashed one ran alone and so is the one to blame.
+        """
+        alone = len(broken) + len(self.running) == 1
+        for future in stuck:
+            (index, _), started = self.running.pop(future)
+            self._emit(_killed_record(index, TIMEOUT, started))
+        broken.extend(self.running.values())
+        self.running.clear()
+        for task, started in broken:
+            if stuck or not alone:
+                self.suspects.append(task)
+            else:
+                self._emit(_killed_record(task[0], CRASHED, started))
+        kill_pool(self.executor)
+        self.executor = self._new_pool()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Solve every puzzle of a file.")
+    parser.add_argument("file", nargs="?", default=PUZZLE_FILE)
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=None, help="seconds per puzzle"
+    )
+    parser.add_argument(
+        "-n", "--max-nodes", type=int, default=None, help="search nodes per puzzle"
+    )
+    parser.add_argument("-e", "--engine", default="backtracking")
+    parser.add_argument(
+        "-o", "--output", default="-", help="JSONL file, - for stdout"
+    )
+    parser.add_argument("-c", "--cache", default=None, help="SQLite solution cache")
+    parser.add_argument(
+        "-s", "--stats", action="store_true", help="add solver statistics to records"
+    )
+    args = parser.parse_args(argv)
+
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        output = open(args.output, "w", encoding="utf-8")
+    cache = None if args.cache is None else SolutionCache(path=args.cache)
+    try:
+        start = time.perf_counter()
+        counts = run_batch(
+            iter_puzzles(args.file),
+            output,
+            args.workers,
+            args.timeout,
+            args.engine,
+            cache,
+            args.stats,
+            args.max_nodes,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if cache is not None:
+            cache.close()
+    summary = ", ".join(f"{status}: {n}" for status, n in sorted(counts.items()))
+    print(f"{summary} in {time.perf_counter() - start:.2f} seconds", file=sys.stderr)
+    if cache is not None:
+        print(f"cache hits: {cache.hits}, misses: {cache.misses}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
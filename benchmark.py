@@ -0,0 +1,345 @@
+"""Benchmarks of the solver variants on a fixed corpus.
+
+Usage: python benchmark.py [--solvers solver2 optimized ...] [--timeout S]
+                           [--repeat N] [--output results.json]
+                           [--baseline benchmark_baseline.json]
+       python benchmark.py --build-corpus
+
+Every solver module solves every puzzle of `benchmark_corpus.json`, from
+4x4 to 15x15 with an easy and a hard puzzle per size. A run reports:
+
+- `time`: the best wall time of `--repeat` runs;
+- `nodes`: the search nodes, `PuzzleSolver.nodes`;
+- `propagations`: how often the candidates were recomputed, counted as
+  calls to `_refresh_state` and `_update_after_assignment`;
+- `peak_memory`: the peak of traced allocations in bytes, from a separate
+  run under `tracemalloc` so the tracing does not slow the timed ones.
+
+The import time of every solver module is measured as well, with
+`python -X importtime` in a fresh interpreter after a first import has
+written the bytecode cache.
+
+The results are written as JSON. With `--baseline`, they are compared to
+stored results and the exit status is 1 if any run got slower by more than
+`TIME_TOLERANCE`, uses more nodes, propagations or memory, or no longer
+solves its puzzle, or if a module takes over `MIN_IMPORT_DELTA` longer to
+import. A module that cannot be imported, such as `solver.py`
+without loguru, is reported as skipped. Node and propagation counts are
+the same everywhere, but times and memory only compare against a
+baseline recorded on the same machine, so record one first with
+`--output`.
+
+The corpus is built by `generator.py` from a fixed seed: the hard puzzle
+of a size has no clue that can be removed, and the easy one gets half of
+the removed clues back.
+"""
+
+import argparse
+import contextlib
+import gc
+import importlib
+import json
+import os
+import platform
+import random
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from batch import ERROR, SOLVED, TIMEOUT, UNSOLVED, PuzzleTimeout
+from validation import is_solution
+
+CORPUS_FILE = "benchmark_corpus.json"
+SOLVERS = ("solver", "optimized", "solver2")
+CORPUS_SIZES = (4, 5, 6, 8, 10, 12, 15)
+CORPUS_SEED = 2024
+SKIPPED = "skipped"
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_REPEAT = 3
+# A run has regressed if it is this much slower than the baseline, and by
+# more than MIN_TIME_DELTA seconds so that noise on tiny runs is ignored.
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.10
+MIN_TIME_DELTA = 0.05
+MIN_IMPORT_DELTA = 0.005
+
+PROPAGATION_METHODS = ("_refresh_state", "_update_after_assignment")
+
+Grid = List[List[int]]
+Result = Dict[str, Any]
+
+
+def build_corpus(seed: int = CORPUS_SEED) -> List[Dict[str, Any]]:
+    from generator import random_solution, remove_clues
+
+    rng = random.Random(seed)
+    corpus = []
+    for size in CORPUS_SIZES:
+        solution = random_solution(size, rng)
+        hard = remove_clues(solution, rng)
+        removed = [
+            (x, y) for x in range(size) for y in range(size) if hard[x][y] == 0
+        ]
+        easy = [list(row) for row in hard]
+        for x, y in rng.sample(removed, len(removed) // 2):
+            easy[x][y] = solution[x][y]
+        for level, puzzle in (("easy", easy), ("hard", hard)):
+            corpus.append(
+                {"name": f"{size}x{size}-{level}", "level": level, "puzzle": puzzle}
+            )
+    return corpus
+
+
+def load_corpus(file: str = CORPUS_FILE) -> List[Dict[str, Any]]:
+    with open(file, "r", encoding="utf-8") as f:
+        corpus: List[Dict[str, Any]] = json.load(f)
+    return corpus
+
+
+def _raise_timeout(signum: int, frame: Any) -> None:
+    raise PuzzleTimeout()
+
+
+@contextlib.contextmanager
+def _time_limit(timeout: Optional[float]) -> Iterator[None]:
+    if timeout is None or not hasattr(signal, "setitimer"):
+        yield
+        return
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def _counting(method: Callable[..., Any], counter: List[int]) -> Callable[..., Any]:
+    def counted(*args: Any, **kwargs: Any) -> Any:
+        counter[0] += 1
+        return method(*args, **kwargs)
+
+    return counted
+
+
+def run_once(
+    module: Any, puzzle: Grid, timeout: Optional[float]
+) -> Tuple[str, float, int, int]:
+    """Status, wall time, nodes and propagations of one solve.
+
+    Not every variant's `solve` returns whether it succeeded, so a run
+    counts as solved when it leaves a solution on the board, checked with
+    `validation.is_solution`; a full board that breaks the rules does not.
+    """
+    state = module.FieldState.from_list_to_state(puzzle)
+    solver = module.PuzzleSolver(state)
+    propagations = [0]
+    for name in PROPAGATION_METHODS:
+        if hasattr(solver, name):
+            setattr(solver, name, _counting(getattr(solver, name), propagations))
+    # Like timeit, keep the collector out of the timed run.
+    gc.collect()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    start = time.perf_counter()
+    try:
+        with _time_limit(timeout):
+            solver.solve()
+        size = len(puzzle)
+        board = [[state.get_state((x, y)) for y in range(size)] for x in range(size)]
+        status = SOLVED if is_solution(puzzle, board) else UNSOLVED
+    except PuzzleTimeout:
+        status = TIMEOUT
+    except Exception:
+        status = ERROR
+    finally:
+        elapsed = time.perf_counter() - start
+        if gc_was_enabled:
+            gc.enable()
+    return status, elapsed, solver.nodes, propagations[0]
+
+
+def peak_memory(module: Any, puzzle: Grid, timeout: Optional[float]) -> int:
+    tracemalloc.start()
+    try:
+        run_once(module, puzzle, timeout)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(
+    corpus: List[Dict[str, Any]],
+    solvers: Tuple[str, ...] = SOLVERS,
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    repeat: int = DEFAULT_REPEAT,
+    log: IO[str] = sys.stderr,
+) -> List[Result]:
+    results = []
+    for name in solvers:
+        try:
+            module = importlib.import_module(name)
+        except ImportError as e:
+            print(f"{name}: skipped, {e}", file=log)
+            results.append({"solver": name, "status": SKIPPED, "error": str(e)})
+            continue
+        for entry in corpus:
+            result: Result = {"solver": name, "puzzle": entry["name"]}
+            times = []
+            for _ in range(repeat):
+                status, elapsed, nodes, propagations = run_once(
+                    module, entry["puzzle"], timeout
+                )
+                times.append(elapsed)
+                if status != SOLVED:
+                    break
+            result.update(
+                status=status,
+                time=round(min(times), 6),
+                nodes=nodes,
+                propagations=propagations,
+            )
+            if status == SOLVED:
+                result["peak_memory"] = peak_memory(module, entry["puzzle"], timeout)
+            print(
+                f"{name} {entry['name']}: {status} in {result['time']:.3f} s,"
+                f" {nodes} nodes",
+                file=log,
+            )
+            results.append(result)
+    return results
+
+
+def import_time(name: str) -> Optional[float]:
+    """Seconds `name` takes to import in a fresh interpreter, or None."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    command = [sys.executable, "-X", "importtime", "-c", f"import {name}"]
+    subprocess.run(command, env=env, capture_output=True)
+    done = subprocess.run(command, env=env, capture_output=True, text=True)
+    if done.returncode != 0:
+        return None
+    for line in reversed(done.stderr.splitlines()):
+        # import time: self [us] | cumulative | imported package
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == name:
+            return int(fields[1]) / 1e6
+    return None
+
+
+def measure_imports(solvers: Tuple[str, ...] = SOLVERS) -> Dict[str, float]:
+    imports = {}
+    for name in solvers:
+        seconds = import_time(name)
+        if seconds is not None:
+            imports[name] = round(seconds, 6)
+    return imports
+
+
+def compare_imports(
+    imports: Dict[str, float], baseline: Dict[str, float]
+) -> List[str]:
+    return [
+        f"{name}: imports in {seconds * 1000:.1f} ms,"
+        f" was {baseline[name] * 1000:.1f} ms"
+        for name, seconds in imports.items()
+        if name in baseline
+        and seconds > baseline[name] * (1 + TIME_TOLERANCE)
+        and seconds - baseline[name] > MIN_IMPORT_DELTA
+    ]
+
+
+def compare(results: List[Result], baseline: List[Result]) -> List[str]:
+    """Descriptions of the runs that got worse than in the baseline."""
+    previous = {(r["solver"], r.get("puzzle")): r for r in baseline}
+    regressions = []
+    for result in results:
+        key = (result["solver"], result.get("puzzle"))
+        old = previous.get(key)
+        if old is None or old["status"] == SKIPPED or result["status"] == SKIPPED:
+            continue
+        regressions += _run_regressions(f"{key[0]} {key[1]}", result, old)
+    return regressions
+
+
+def _run_regressions(label: str, result: Result, old: Result) -> List[str]:
+    if result["status"] != SOLVED:
+        if old["status"] == SOLVED:
+            return [f"{label}: {result['status']}, was solved"]
+        return []
+    regressions = []
+    if (
+        result["time"] > old["time"] * (1 + TIME_TOLERANCE)
+        and result["time"] - old["time"] > MIN_TIME_DELTA
+    ):
+        regressions.append(f"{label}: {result['time']:.3f} s, was {old['time']:.3f} s")
+    for metric in ("nodes", "propagations"):
+        if result[metric] > old[metric]:
+            regressions.append(f"{label}: {result[metric]} {metric}, was {old[metric]}")
+    if result["peak_memory"] > old["peak_memory"] * (1 + MEMORY_TOLERANCE):
+        regressions.append(
+            f"{label}: peak memory {result['peak_memory']} bytes,"
+            f" was {old['peak_memory']}"
+        )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the solvers.")
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    parser.add_argument(
+        "--build-corpus",
+        action="store_true",
+        help="regenerate the corpus file and exit",
+    )
+    parser.add_argument("--solvers", nargs="+", default=list(SOLVERS))
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per run"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("-o", "--output", default="-", help="JSON file, - for stdout")
+    parser.add_argument(
+        "-b", "--baseline", default=None, help="JSON results to compare"
+    )
+    args = parser.parse_args(argv)
+
+    if args.build_corpus:
+        entries = ",\n".join(json.dumps(entry) for entry in build_corpus())
+        with open(args.corpus, "w", encoding="utf-8") as f:
+            f.write(f"[\n{entries}\n]\n")
+        return 0
+
+    imports = measure_imports(tuple(args.solvers))
+    results = run_benchmarks(
+        load_corpus(args.corpus), tuple(args.solvers), args.timeout, args.repeat
+    )
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "imports": imports,
+        "results": results,
+    }
+    if args.output == "-":
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline is None:
+        return 0
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare_imports(imports, baseline.get("imports", {}))
+    regressions += compare(results, baseline["results"])
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
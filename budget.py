@@ -0,0 +1,81 @@
+import math
+import time
+
+SOLVED = "solved"
+UNSOLVED = "unsolved"
+TIMEOUT = "timeout"
+NODE_LIMIT = "node_limit"
+
+# Search nodes between two looks at the clock.
+CLOCK_INTERVAL = 4
+
+
+class SolveResult:
+    """Outcome of `PuzzleSolver.solve_within`.
+
+    `status` is `SOLVED`, `UNSOLVED`, or `TIMEOUT` or `NODE_LIMIT` when the
+    budget ran out first. `board` holds the rows of the solution, or else
+    of the board as propagation left it before the search. `stats` is the
+    `SolverStats` of the solve.
+    """
+
+    def __init__(self, status, board, stats):
+        self.status = status
+        self.board = board
+        self.stats = stats
+
+    def __repr__(self):
+        return f"SolveResult({self.status!r}, nodes={self.stats.nodes})"
+
+    def as_dict(self):
+        return {
+            "status": self.status,
+            "board": self.board,
+            "stats": self.stats.as_dict(),
+        }
+
+
+class BudgetMixin:
+    """Stops the search once it has used up a node or time budget.
+
+    The search compares `nodes` with `_check_at` before every node and only
+    calls `_budget_spent` once it is reached, so a search without a budget
+    pays one comparison per node and one with a deadline reads the clock
+    every `CLOCK_INTERVAL` nodes. Why the last search stopped early is kept
+    in `stop_reason`.
+    """
+
+    stop_reason = None
+    _check_at = math.inf
+    _max_nodes = None
+    _deadline = None
+
+    def _start_budget(self, max_nodes=None, deadline=None):
+        """`deadline` is a `time.monotonic()` time."""
+        self._max_nodes = max_nodes
+        self._deadline = deadline
+        self.stop_reason = None
+        if max_nodes is None and deadline is None:
+            self._check_at = math.inf
+        else:
+            self._check_at = self.nodes
+
+    def _stop_budget(self):
+        self._max_nodes = None
+        self._deadline = None
+        self._check_at = math.inf
+
+    def _budget_spent(self):
+        if self._max_nodes is not None and self.nodes >= self._max_nodes:
+            self.stop_reason = NODE_LIMIT
+            return True
+        check_at = math.inf
+        if self._deadline is not None:
+            if time.monotonic() >= self._deadline:
+                self.stop_reason = TIMEOUT
+                return True
+            check_at = self.nodes + CLOCK_INTERVAL
+        if self._max_nodes is not None:
+            check_at = min(check_at, self._max_nodes)
+        self._check_at = check_at
+        return False
@@ -0,0 +1,179 @@
+"""Solutions cached by puzzle, shared between rotated and mirrored copies.
+
+A puzzle is turned into its canonical form, the smallest of its 8 images
+under the symmetries of the square, and its solution is stored in that
+orientation. A lookup canonicalizes the puzzle the same way and maps the
+stored solution back through the inverse symmetry. Solutions are kept per
+engine, as the engines do not all solve the same puzzles the same way.
+
+Recent entries live in a bounded in-memory LRU; with a `path`, every
+solution is also written to an SQLite file that survives restarts.
+"""
+
+import hashlib
+import json
+import sqlite3
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from validation import is_solution
+
+Grid = List[List[int]]
+
+DEFAULT_MAX_SIZE = 1024
+DEFAULT_ENGINE = "backtracking"
+
+
+def _identity(g: Grid) -> Grid:
+    return [list(row) for row in g]
+
+
+def _rotate_90(g: Grid) -> Grid:
+    return [list(row) for row in zip(*g[::-1])]
+
+
+def _rotate_180(g: Grid) -> Grid:
+    return [row[::-1] for row in g[::-1]]
+
+
+def _rotate_270(g: Grid) -> Grid:
+    return [list(row) for row in zip(*g)][::-1]
+
+
+def _transpose(g: Grid) -> Grid:
+    return [list(row) for row in zip(*g)]
+
+
+def _anti_transpose(g: Grid) -> Grid:
+    return _rotate_180(_transpose(g))
+
+
+def _mirror_rows(g: Grid) -> Grid:
+    return [row[::-1] for row in g]
+
+
+def _mirror_columns(g: Grid) -> Grid:
+    return [list(row) for row in g[::-1]]
+
+
+SYMMETRIES: Tuple[Callable[[Grid], Grid], ...] = (
+    _identity,
+    _rotate_90,
+    _rotate_180,
+    _rotate_270,
+    _transpose,
+    _anti_transpose,
+    _mirror_rows,
+    _mirror_columns,
+)
+# Index of the inverse of every symmetry above.
+INVERSES = (0, 3, 2, 1, 4, 5, 6, 7)
+
+
+def canonical_form(puzzle: Grid) -> Tuple[Grid, int]:
+    """Smallest image of the puzzle and the index of the symmetry giving it."""
+    return min(
+        ((symmetry(puzzle), index) for index, symmetry in enumerate(SYMMETRIES)),
+        key=lambda image: image[0],
+    )
+
+
+def puzzle_key(canonical: Grid, engine: str = DEFAULT_ENGINE) -> str:
+    text = engine + ":" + json.dumps(canonical, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SolutionCache:
+    def __init__(
+        self, max_size: int = DEFAULT_MAX_SIZE, path: Optional[str] = None
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("Cache size should be positive")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Grid]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS solutions"
+                " (key TEXT PRIMARY KEY, solution TEXT NOT NULL)"
+            )
+            self._db.commit()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, puzzle: Grid, engine: str = DEFAULT_ENGINE) -> Optional[Grid]:
+        """Cached solution in the puzzle's orientation, or None."""
+        canonical, symmetry = canonical_form(puzzle)
+        key = puzzle_key(canonical, engine)
+        solution = self._lookup(key)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return SYMMETRIES[INVERSES[symmetry]](solution)
+
+    def put(self, puzzle: Grid, solution: Grid, engine: str = DEFAULT_ENGINE) -> None:
+        canonical, symmetry = canonical_form(puzzle)
+        key = puzzle_key(canonical, engine)
+        stored = SYMMETRIES[symmetry](solution)
+        self._remember(key, stored)
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO solutions VALUES (?, ?)",
+                (key, json.dumps(stored, separators=(",", ":"))),
+            )
+            self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self)}
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _lookup(self, key: str) -> Optional[Grid]:
+        solution = self._entries.get(key)
+        if solution is not None:
+            self._entries.move_to_end(key)
+            return solution
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT solution FROM solutions WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        solution = json.loads(row[0])
+        self._remember(key, solution)
+        return solution
+
+    def _remember(self, key: str, solution: Grid) -> None:
+        self._entries[key] = solution
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+def solve_cached(
+    puzzle: Grid, cache: SolutionCache, engine: str = DEFAULT_ENGINE
+) -> Optional[Grid]:
+    """Solution of the puzzle, from the cache or from `PuzzleSolver`."""
+    solution = cache.get(puzzle, engine)
+    if solution is not None:
+        return solution
+
+    from solver2 import FieldState, PuzzleSolver
+
+    state = FieldState.from_list_to_state(puzzle)
+    if not PuzzleSolver(state).solve(engine=engine):
+        return None
+    size = state.field.size()
+    solution = [[state.get_state((x, y)) for y in range(size)] for x in range(size)]
+    if is_solution(puzzle, solution):
+        cache.put(puzzle, solution, engine)
+    return solution
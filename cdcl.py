@@ -0,0 +1,301 @@
+"""A small conflict-driven clause-learning SAT solver in pure Python.
+
+Variables are positive integers returned by `new_var` and literals use the
+DIMACS convention (`-v` is the negation of `v`). Internally a literal is
+`2 * index + sign`, so its negation is `literal ^ 1`.
+
+The solver uses two watched literals for unit propagation, first-UIP
+conflict analysis with non-chronological backjumping, VSIDS variable
+activities with phase saving, Luby restarts and periodic removal of the
+less useful learnt clauses. Clauses can be added between calls to `solve`,
+which keeps everything learnt so far.
+"""
+
+import heapq
+import math
+
+TRUE = 1
+FALSE = -1
+UNDEF = 0
+
+_RESTART_BASE = 100
+_ACTIVITY_DECAY = 0.95
+
+
+def _luby(i):
+    """The i-th element (1-based) of the Luby sequence 1 1 2 1 1 2 4 ..."""
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i = i % size
+    return 1 << power
+
+
+class SatSolver:
+    def __init__(self):
+        self._values = []  # per internal literal
+        self._level = []
+        self._reason = []
+        self._activity = []
+        self._phase = []
+        self._watches = []
+        self._clauses = []
+        self._learnts = []
+        self._trail = []
+        self._trail_lim = []
+        self._queue_head = 0
+        self._heap = []
+        self._activity_inc = 1.0
+        self._max_learnts = 2000
+        self._unsat = False
+        self.conflicts = 0
+        self.decisions = 0
+
+    def num_vars(self):
+        return len(self._level)
+
+    def new_var(self):
+        self._values += [UNDEF, UNDEF]
+        self._level.append(0)
+        self._reason.append(None)
+        self._activity.append(0.0)
+        self._phase.append(1)  # Negative literals first
+        self._watches += [[], []]
+        var = len(self._level) - 1
+        heapq.heappush(self._heap, (0.0, var))
+        return var + 1
+
+    def add_clause(self, clause):
+        """Adds a clause; returns False once the formula is known unsatisfiable."""
+        if self._unsat:
+            return False
+        self._cancel_until(0)
+
+        lits = set()
+        for lit in clause:
+            internal = self._internal(lit)
+            value = self._values[internal]
+            if value == TRUE or internal ^ 1 in lits:
+                return True  # Satisfied or a tautology
+            if value == UNDEF:
+                lits.add(internal)
+        lits = list(lits)
+
+        if not lits:
+            self._unsat = True
+        elif len(lits) == 1:
+            self._enqueue(lits[0], None)
+            self._unsat = self._propagate() is not None
+        else:
+            self._attach(lits)
+            self._clauses.append(lits)
+        return not self._unsat
+
+    def solve(self, max_conflicts=None):
+        """Returns True (satisfiable), False (unsatisfiable) or None (budget hit)."""
+        if self._unsat:
+            return False
+        self._cancel_until(0)
+        if self._propagate() is not None:
+            self._unsat = True
+            return False
+
+        restarts = 0
+        conflicts_left = math.inf if max_conflicts is None else max_conflicts
+        while True:
+            restarts += 1
+            budget = min(_luby(restarts) * _RESTART_BASE, conflicts_left)
+            result = self._search(budget)
+            if result is not None:
+                return result
+            conflicts_left -= budget
+            if conflicts_left <= 0:
+                return None
+            if len(self._learnts) > self._max_learnts:
+                self._reduce_learnts()
+
+    def _search(self, budget):
+        """Searches until a model, a proof or the `budget`-th conflict.
+
+        Returns True, False, or None after restarting at level 0.
+        """
+        while True:
+            conflict = self._propagate()
+            if conflict is None:
+                if not self._decide():
+                    return True
+                continue
+            self.conflicts += 1
+            if not self._trail_lim:
+                self._unsat = True
+                return False
+            self._learn(conflict)
+            budget -= 1
+            if budget <= 0:
+                self._cancel_until(0)
+                return None
+
+    def _decide(self):
+        """Assigns the next branch variable; False with a model instead."""
+        var = self._pick_branch_var()
+        if var is None:
+            self._model = [self._values[2 * v] == TRUE for v in range(self.num_vars())]
+            self._cancel_until(0)
+            return False
+        self.decisions += 1
+        self._trail_lim.append(len(self._trail))
+        self._enqueue(2 * var + self._phase[var], None)
+        return True
+
+    def _learn(self, conflict):
+        learnt, backjump_level = self._analyze(conflict)
+        self._cancel_until(backjump_level)
+        if len(learnt) == 1:
+            self._enqueue(learnt[0], None)
+        else:
+            self._attach(learnt)
+            self._learnts.append(learnt)
+            self._enqueue(learnt[0], learnt)
+        self._activity_inc /= _ACTIVITY_DECAY
+
+    def value(self, var):
+        """Value of a variable in the last model found by `solve`."""
+        return self._model[var - 1]
+
+    def _internal(self, lit):
+        var = abs(lit) - 1
+        if var >= self.num_vars():
+            raise ValueError(f"Unknown variable {abs(lit)}")
+        return 2 * var + (lit < 0)
+
+    def _attach(self, lits):
+        self._watches[lits[0]].append(lits)
+        self._watches[lits[1]].append(lits)
+
+    def _enqueue(self, lit, reason):
+        var = lit >> 1
+        self._values[lit] = TRUE
+        self._values[lit ^ 1] = FALSE
+        self._level[var] = len(self._trail_lim)
+        self._reason[var] = reason
+        self._trail.append(lit)
+
+    def _propagate(self):
+        values = self._values
+        watches = self._watches
+        trail = self._trail
+        while self._queue_head < len(trail):
+            false_lit = trail[self._queue_head] ^ 1
+            self._queue_head += 1
+            watched = watches[false_lit]
+            kept = []
+            i = 0
+            while i < len(watched):
+                clause = watched[i]
+                i += 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if values[first] == TRUE:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    if values[clause[k]] != FALSE:
+                        clause[1], clause[k] = clause[k], false_lit
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if values[first] == FALSE:
+                        kept.extend(watched[i:])
+                        watches[false_lit] = kept
+                        self._queue_head = len(trail)
+                        return clause
+                    self._enqueue(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    def _analyze(self, conflict):
+        seen = set()
+        learnt = [None]
+        current_level = len(self._trail_lim)
+        counter = 0
+        lit = None
+        clause = conflict
+        index = len(self._trail) - 1
+        while True:
+            for q in clause if lit is None else clause[1:]:
+                var = q >> 1
+                if var not in seen and self._level[var] > 0:
+                    seen.add(var)
+                    self._bump(var)
+                    if self._level[var] == current_level:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while self._trail[index] >> 1 not in seen:
+                index -= 1
+            lit = self._trail[index]
+            index -= 1
+            clause = self._reason[lit >> 1]
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = lit ^ 1
+
+        if len(learnt) == 1:
+            return learnt, 0
+        deepest = max(range(1, len(learnt)), key=lambda k: self._level[learnt[k] >> 1])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self._level[learnt[1] >> 1]
+
+    def _cancel_until(self, level):
+        if len(self._trail_lim) <= level:
+            return
+        start = self._trail_lim[level]
+        for lit in reversed(self._trail[start:]):
+            var = lit >> 1
+            self._values[lit] = UNDEF
+            self._values[lit ^ 1] = UNDEF
+            self._reason[var] = None
+            self._phase[var] = lit & 1
+            heapq.heappush(self._heap, (-self._activity[var], var))
+        del self._trail[start:]
+        del self._trail_lim[level:]
+        self._queue_head = len(self._trail)
+
+    def _pick_branch_var(self):
+        heap = self._heap
+        while heap:
+            activity, var = heapq.heappop(heap)
+            if self._values[2 * var] == UNDEF and -activity == self._activity[var]:
+                return var
+        for var in range(self.num_vars()):
+            if self._values[2 * var] == UNDEF:
+                return var
+        return None
+
+    def _bump(self, var):
+        self._activity[var] += self._activity_inc
+        if self._activity[var] > 1e100:
+            self._activity = [a * 1e-100 for a in self._activity]
+            self._activity_inc *= 1e-100
+            self._heap = [(-a, v) for v, a in enumerate(self._activity)]
+            heapq.heapify(self._heap)
+        elif self._values[2 * var] == UNDEF:
+            heapq.heappush(self._heap, (-self._activity[var], var))
+
+    def _reduce_learnts(self):
+        # Only called at decision level 0, where no learnt clause is the
+        # reason of an assignment that can still be analysed.
+        self._learnts.sort(key=len)
+        keep = len(self._learnts) // 2
+        self._learnts = [c for i, c in enumerate(self._learnts) if i < keep or len(c) <= 2]
+        self._max_learnts = int(self._max_learnts * 1.1)
+        self._watches = [[] for _ in self._watches]
+        for clause in self._clauses + self._learnts:
+            self._attach(clause)
@@ -0,0 +1,103 @@
+from field import FieldState
+
+
+class DecompositionMixin:
+    """Splits the search into parts of the board that cannot interact.
+
+    Two empty cells only constrain each other through a chain of empty
+    cells and unfinished groups: a complete region just forbids its value
+    next to it, which every cell checks on its own. So the connected
+    components of empty cells, joined through the unfinished groups they
+    touch, are solved one after the other, smallest first, and a failure
+    in one never retries the assignments of another. While a component is
+    searched, `_scope` holds its cells and the branching ignores the groups
+    outside of it.
+
+    With `workers`, the components are solved in separate processes and the
+    pool is killed as soon as one of them has no solution.
+    """
+
+    _scope = None
+
+    def _independent_components(self):
+        free_cells = self._free_cells()
+        neighbours = self.field_state.field.get_neighbour_cells
+        seen = set()
+        components = []
+        for start in sorted(free_cells):
+            if start in seen:
+                continue
+            seen.add(start)
+            component = []
+            stack = [start]
+            while stack:
+                cell = stack.pop()
+                component.append(cell)
+                group = self.unfilled_groups.get(cell)
+                for n in neighbours(cell):
+                    if n in seen:
+                        continue
+                    # Through a group only to its own cells, an adjacent
+                    # region of another value is not affected by it.
+                    n_group = self.unfilled_groups.get(n)
+                    if n in free_cells or n_group is not None and (
+                        group is None or n_group is group
+                    ):
+                        seen.add(n)
+                        stack.append(n)
+            components.append(frozenset(component))
+        return sorted(components, key=len)
+
+    def _solve_components(self, components):
+        if len(components) <= 1:
+            return self._try_fill_empty_cells()
+        for component in components:
+            self._scope = component
+            try:
+                if not self._try_fill_empty_cells():
+                    return False
+            finally:
+                self._scope = None
+        return True
+
+    def _solve_components_parallel(self, rows, components, workers):
+        """Solves every component in a worker and paints the results."""
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        from batch import init_worker, kill_pool
+
+        options = {
+            "incremental": self.incremental,
+            "branching": self.branching,
+            "backjumping": self.backjumping,
+            "vectorized": self.vectorized,
+        }
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        try:
+            running = {
+                executor.submit(
+                    solve_component, type(self), rows, options, component
+                ): component
+                for component in components
+            }
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    component = running.pop(future)
+                    solution = future.result()
+                    if solution is None:
+                        kill_pool(executor)
+                        return False
+                    for x, y in component:
+                        self.field_state.set_state((x, y), solution[x][y])
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return True
+
+
+def solve_component(solver_class, rows, options, component):
+    """Board solved inside `component` in a worker process, or None."""
+    solver = solver_class(FieldState.from_list_to_state(rows), **options)
+    if not solver._propagate_root() or not solver._solve_components([component]):
+        return None
+    return solver._rows()
@@ -0,0 +1,123 @@
+"""Knuth's Algorithm X on Dancing Links.
+
+Primary items have to be covered exactly once, secondary items at most
+once. Nodes live in parallel lists; node 0 is the root of the primary
+header list and nodes 1..len(items) are the item headers.
+"""
+
+
+class DancingLinks:
+    def __init__(self, primary, secondary=()):
+        self.items = list(primary) + list(secondary)
+        self._index = {item: i + 1 for i, item in enumerate(self.items)}
+        count = len(self.items)
+        self._left = list(range(-1, count))
+        self._right = list(range(1, count + 2))
+        self._up = list(range(count + 1))
+        self._down = list(range(count + 1))
+        self._column = list(range(count + 1))
+        self._row = [None] * (count + 1)
+        self._size = [0] * (count + 1)
+
+        # Primary headers form the circular list searched for an item to
+        # cover; secondary headers only link to themselves.
+        last_primary = len(primary)
+        self._left[0] = last_primary
+        self._right[last_primary] = 0
+        for header in range(last_primary + 1, count + 1):
+            self._left[header] = self._right[header] = header
+
+        self.options = []
+
+    def add_option(self, items, data=None):
+        """Adds an option covering `items` and returns its index."""
+        option = len(self.options)
+        self.options.append(data)
+        first = None
+        for item in items:
+            header = self._index[item]
+            node = len(self._column)
+            self._column.append(header)
+            self._row.append(option)
+            self._up.append(self._up[header])
+            self._down.append(header)
+            self._down[self._up[header]] = node
+            self._up[header] = node
+            self._size[header] += 1
+            if first is None:
+                first = node
+                self._left.append(node)
+                self._right.append(node)
+            else:
+                self._left.append(self._left[first])
+                self._right.append(first)
+                self._right[self._left[first]] = node
+                self._left[first] = node
+        return option
+
+    def search(self):
+        """Yields every exact cover as a list of option indices."""
+        chosen = []
+
+        def solve():
+            if self._right[0] == 0:
+                yield list(chosen)
+                return
+            header = self._choose_column()
+            if self._size[header] == 0:
+                return
+            self._cover(header)
+            node = self._down[header]
+            while node != header:
+                chosen.append(self._row[node])
+                other = self._right[node]
+                while other != node:
+                    self._cover(self._column[other])
+                    other = self._right[other]
+                yield from solve()
+                other = self._left[node]
+                while other != node:
+                    self._uncover(self._column[other])
+                    other = self._left[other]
+                chosen.pop()
+                node = self._down[node]
+            self._uncover(header)
+
+        return solve()
+
+    def _choose_column(self):
+        best = None
+        header = self._right[0]
+        while header != 0:
+            if best is None or self._size[header] < self._size[best]:
+                best = header
+                if self._size[best] == 0:
+                    break
+            header = self._right[header]
+        return best
+
+    def _cover(self, header):
+        self._right[self._left[header]] = self._right[header]
+        self._left[self._right[header]] = self._left[header]
+        row = self._down[header]
+        while row != header:
+            node = self._right[row]
+            while node != row:
+                self._down[self._up[node]] = self._down[node]
+                self._up[self._down[node]] = self._up[node]
+                self._size[self._column[node]] -= 1
+                node = self._right[node]
+            row = self._down[row]
+
+    def _uncover(self, header):
+        row = self._up[header]
+        while row != header:
+            node = self._left[row]
+            while node != row:
+                self._size[self._column[node]] += 1
+                self._down[self._up[node]] = node
+                self._up[self._down[node]] = node
+                node = self._left[node]
+            row = self._up[row]
+        self._right[self._left[header]] = header
+        self._left[self._right[header]] = header
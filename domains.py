@@ -0,0 +1,53 @@
+"""Candidate domains stored as integer bitsets.
+
+Bit `v` of a domain is set when value `v` is still possible for the cell.
+Python integers are unbounded, so domains are not limited to one-digit
+values.
+"""
+
+
+def value_bit(value):
+    return 1 << value
+
+
+def values_mask(values):
+    mask = 0
+    for value in values:
+        mask |= 1 << value
+    return mask
+
+
+def range_mask(low, high):
+    """Domain holding every value from `low` to `high` inclusive."""
+    if high < low:
+        return 0
+    return ((1 << (high - low + 1)) - 1) << low
+
+
+def has_value(mask, value):
+    return mask >> value & 1 == 1
+
+
+try:
+    popcount = int.bit_count
+except AttributeError:  # Python < 3.10
+
+    def popcount(mask):
+        return bin(mask).count("1")
+
+
+def is_single(mask):
+    return mask != 0 and mask & (mask - 1) == 0
+
+
+def lowest_value(mask):
+    """Smallest value of a non-empty domain."""
+    return (mask & -mask).bit_length() - 1
+
+
+def iter_values(mask):
+    """Values of a domain in ascending order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
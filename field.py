@@ -0,0 +1,220 @@
+import array
+import functools
+
+from regions import RegionIndex
+
+# Typecode of the cell storage: unsigned 16-bit values are enough for any
+# group size on boards up to 255x255 and keep a 200x200 board under 80 KB.
+STATE_TYPECODE = "H"
+MAX_VALUE = 2 ** (8 * array.array(STATE_TYPECODE).itemsize) - 1
+_MASK64 = 2**64 - 1
+
+
+def _mix64(x):
+    # The splitmix64 finalizer: a cheap bijection that scatters every input
+    # bit over the whole 64-bit output.
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+@functools.lru_cache(maxsize=None)
+def zobrist_key(cell_id, value):
+    """Pseudo-random 64-bit key of `value` in cell `cell_id`, 0 if empty."""
+    if value == 0:
+        return 0
+    return _mix64(cell_id << 16 | value)
+
+
+def empty_hash(size):
+    """Hash of an empty board, different for every size."""
+    return _mix64(size << 32 | 0xFFFF)
+
+
+@functools.lru_cache(maxsize=None)
+def _build_tables(size):
+    cells = tuple((x, y) for x in range(size) for y in range(size))
+    ids = range(size * size)
+    neighbour_ids = []
+    neighbour_cells = []
+    for x, y in cells:
+        row = []
+        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
+            nx, ny = x + dx, y + dy
+            if (0 <= nx < size) and (0 <= ny < size):
+                row.append(ids[nx * size + ny])
+        neighbour_ids.append(tuple(row))
+        neighbour_cells.append(tuple(cells[n] for n in row))
+    return cells, tuple(neighbour_ids), tuple(neighbour_cells)
+
+
+def neighbour_cells(cell, size):
+    """The cells next to `cell` on a board of `size` by `size` cells."""
+    return _build_tables(size)[2][cell[0] * size + cell[1]]
+
+
+def region_cells(start, neighbours, value_at):
+    """Cells of the region of `start`, the connected cells of its value.
+
+    They are listed in search order from `start`, so every prefix of the
+    list is connected.
+    """
+    value = value_at(start)
+    region = [start]
+    members = {start}
+    for cell in region:
+        for n in neighbours(cell):
+            if n not in members and value_at(n) == value:
+                members.add(n)
+                region.append(n)
+    return region
+
+
+def grid_region(board, start):
+    """`region_cells` of a board given as a list of rows."""
+    size = len(board)
+    return region_cells(
+        start, lambda c: neighbour_cells(c, size), lambda c: board[c[0]][c[1]]
+    )
+
+
+class Field:
+    def __init__(self, size):
+        self.check_size(size)
+        self._size = size
+        self._cells, self._neighbour_ids, self._neighbour_cells = _build_tables(size)
+
+    @staticmethod
+    def check_size(size):
+        if type(size) is not int:
+            raise TypeError("Field size should be an integer")
+
+        if size < 2:
+            raise ValueError("Minimum field size is 2")
+
+    def size(self):
+        return self._size
+
+    def cells_count(self):
+        return len(self._cells)
+
+    def get_all_cells(self):
+        return iter(self._cells)
+
+    def get_neighbour_cells(self, cell):
+        return self._neighbour_cells[cell[0] * self._size + cell[1]]
+
+    def cell_id(self, cell):
+        return cell[0] * self._size + cell[1]
+
+    def get_cell(self, cell_id):
+        return self._cells[cell_id]
+
+    def get_neighbour_ids(self, cell_id):
+        return self._neighbour_ids[cell_id]
+
+
+class FieldState:
+    """Board values stored in a flat array indexed by `Field` cell ids.
+
+    The `(x, y)` tuple methods are kept as a thin adapter over the id-based
+    `get_value`/`set_value` ones used on hot paths. Connected regions are
+    tracked by a `RegionIndex` that is updated on every change, and `hash`
+    is the Zobrist hash of the board: the empty board's hash xor the
+    `zobrist_key` of every filled cell, so a change updates it with two xors.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self._size = field.size()
+        self._state = array.array(STATE_TYPECODE, [0]) * field.cells_count()
+        self._regions = RegionIndex(field, self._state)
+        self.hash = empty_hash(self._size)
+
+    def __str__(self):
+        result = ""
+        for x in range(self.field.size()):
+            row = ""
+            for y in range(self.field.size()):
+                row += str(self.get_state((x, y))) + " "
+            result += row + "\n"
+        return result
+
+    @staticmethod
+    def from_list_to_state(matrix):
+        size = len(matrix)
+        field = Field(size)
+        state = FieldState(field)
+
+        # Values are written directly and the regions labelled once, instead
+        # of updating the index for every cell of the board.
+        for x in range(size):
+            for y in range(size):
+                state.check_value(matrix[x][y])
+                state._state[x * size + y] = matrix[x][y]
+        state._regions.rebuild()
+        state.rehash()
+
+        return state
+
+    @staticmethod
+    def check_value(value):
+        if value < 0:
+            raise ValueError("Value should be non-negative")
+
+        if type(value) is not int:
+            raise TypeError("Value should be an integer")
+
+        if value > MAX_VALUE:
+            raise ValueError(f"Value should not exceed {MAX_VALUE}")
+
+    def set_state(self, coords, value):
+        self.check_value(value)
+        self.set_value(coords[0] * self._size + coords[1], value)
+
+    def get_state(self, coords):
+        return self._state[coords[0] * self._size + coords[1]]
+
+    def set_value(self, cell_id, value):
+        old = self._state[cell_id]
+        if old != value:
+            self.hash ^= zobrist_key(cell_id, old) ^ zobrist_key(cell_id, value)
+            self._regions.detach(cell_id)
+            self._state[cell_id] = value
+            self._regions.attach(cell_id)
+
+    def rehash(self):
+        """Recomputes `hash` after the values were written directly."""
+        self.hash = empty_hash(self._size)
+        for cell_id, value in enumerate(self._state):
+            self.hash ^= zobrist_key(cell_id, value)
+
+    def get_value(self, cell_id):
+        return self._state[cell_id]
+
+    def values(self):
+        """The values of all cells by id, as the array they are stored in.
+
+        Meant to be read in bulk, for example through the buffer protocol;
+        writing to it bypasses `hash` and the region index.
+        """
+        return self._state
+
+    def get_involved(self, cell):
+        get_cell = self.field.get_cell
+        return [get_cell(c) for c in self._regions.members(self.field.cell_id(cell))]
+
+    def get_region_id(self, cell):
+        return self._regions.label(self.field.cell_id(cell))
+
+    def get_region_size(self, cell):
+        return self._regions.size(self.field.cell_id(cell))
+
+    def get_probe_size(self, cell, value):
+        """Size of the region `cell` would join if it was set to `value`.
+
+        Same answer as setting the value, measuring `get_involved` and
+        reverting it, without touching the board.
+        """
+        return self._regions.probe_size(self.field.cell_id(cell), value)
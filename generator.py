@@ -0,0 +1,250 @@
+"""Generation of puzzles with exactly one solution.
+
+Usage: python generator.py [--count N] [--size S] [--workers W]
+                           [--seed SEED] [--max-nodes N]
+                           [--output puzzles.json]
+
+Every puzzle starts from a random solved grid: regions are grown one at a
+time from the first empty cell, keeping the neighbouring values of the
+solver rules apart. Then clues are removed greedily, each removal checked
+with `PuzzleSolver.is_unique`. A check gets `max_nodes` search nodes; one
+that runs out counts as not unique, which keeps the clue, so a puzzle is
+only ever published with a proof of uniqueness. The checks of a process
+share a transposition table, as the boards one check proves dead are often
+reached again by the next ones.
+
+The uniqueness checks of a wave of removal candidates run in parallel. A
+candidate whose removal breaks uniqueness keeps its clue for good, since
+removing more clues only adds solutions. The candidates that are safe on
+their own are removed together if the result is still unique, otherwise
+only the first one is, and the rest are checked again.
+
+The output is a JSON array in the `puzzle.json` format, every puzzle
+followed by its solution, written as each pair is ready.
+"""
+
+import argparse
+import functools
+import random
+import sys
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import IO, TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+from batch import init_worker, pool_size
+from field import neighbour_cells
+
+if TYPE_CHECKING:
+    from transposition import TranspositionTable
+
+Grid = List[List[int]]
+Cell = Tuple[int, int]
+
+DEFAULT_SIZE = 10
+DEFAULT_MAX_VALUE = 9
+GROW_ATTEMPTS = 5
+GRID_ATTEMPTS = 1000
+DEFAULT_MAX_NODES = 200
+
+_table: Optional["TranspositionTable"] = None
+
+
+def random_solution(
+    size: int, rng: random.Random, max_value: int = DEFAULT_MAX_VALUE
+) -> Grid:
+    for _ in range(GRID_ATTEMPTS):
+        grid = _try_random_solution(size, rng, max_value)
+        if grid is not None:
+            return grid
+    raise RuntimeError("Could not build a solved grid")
+
+
+def _try_random_solution(
+    size: int, rng: random.Random, max_value: int
+) -> Optional[Grid]:
+    grid = [[0] * size for _ in range(size)]
+    values = list(range(1, max_value + 1))
+    for x in range(size):
+        for y in range(size):
+            if grid[x][y]:
+                continue
+            rng.shuffle(values)
+            for value in values:
+                region = _grow_region(grid, (x, y), value, rng)
+                if region is not None:
+                    for cx, cy in region:
+                        grid[cx][cy] = value
+                    break
+            else:
+                return None
+    return grid
+
+
+def _grow_region(
+    grid: Grid, start: Cell, value: int, rng: random.Random
+) -> Optional[List[Cell]]:
+    """Random region of `value` cells that touches no value within one."""
+
+    def allowed(cell: Cell) -> bool:
+        return grid[cell[0]][cell[1]] == 0 and all(
+            abs(grid[n[0]][n[1]] - value) > 1
+            for n in neighbour_cells(cell, len(grid))
+            if grid[n[0]][n[1]]
+        )
+
+    if not allowed(start):
+        return None
+    for _ in range(GROW_ATTEMPTS):
+        region = [start]
+        members = {start}
+        frontier = [n for n in neighbour_cells(start, len(grid)) if allowed(n)]
+        while len(region) < value and frontier:
+            cell = frontier.pop(rng.randrange(len(frontier)))
+            if cell in members:
+                continue
+            region.append(cell)
+            members.add(cell)
+            frontier += [
+                n
+                for n in neighbour_cells(cell, len(grid))
+                if n not in members and allowed(n)
+            ]
+        if len(region) == value:
+            return region
+    return None
+
+
+def shared_table() -> "TranspositionTable":
+    """The transposition table of the uniqueness checks in this process."""
+    global _table
+    if _table is None:
+        from transposition import TranspositionTable
+
+        _table = TranspositionTable()
+    return _table
+
+
+def is_unique(puzzle: Grid, max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> bool:
+    from solver2 import FieldState, PuzzleSolver
+
+    state = FieldState.from_list_to_state(puzzle)
+    return PuzzleSolver(state, table=shared_table()).is_unique(max_nodes)
+
+
+def remove_clues(
+    solution: Grid,
+    rng: random.Random,
+    executor: Optional[Executor] = None,
+    wave_size: int = 1,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+) -> Grid:
+    """Clue grid for the solution from which no clue can be removed."""
+    puzzle = [list(row) for row in solution]
+    pending = [(x, y) for x in range(len(solution)) for y in range(len(solution))]
+    rng.shuffle(pending)
+    unique = functools.partial(is_unique, max_nodes=max_nodes)
+    check = map if executor is None else executor.map
+
+    while pending:
+        wave, pending = pending[:wave_size], pending[wave_size:]
+        trials = [_without(puzzle, [cell]) for cell in wave]
+        removable = [cell for cell, ok in zip(wave, check(unique, trials)) if ok]
+        if not removable:
+            continue
+        if len(removable) > 1 and all(
+            check(unique, [_without(puzzle, removable)])
+        ):
+            puzzle = _without(puzzle, removable)
+            continue
+        puzzle = _without(puzzle, removable[:1])
+        pending = removable[1:] + pending
+    return puzzle
+
+
+def _without(puzzle: Grid, cells: List[Cell]) -> Grid:
+    result = [list(row) for row in puzzle]
+    for x, y in cells:
+        result[x][y] = 0
+    return result
+
+
+def generate(
+    count: int,
+    size: int = DEFAULT_SIZE,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None,
+    max_nodes: Optional[int] = DEFAULT_MAX_NODES,
+) -> Iterator[Tuple[Grid, Grid]]:
+    """Yields `count` pairs of a unique puzzle and its solution."""
+    rng = random.Random(seed)
+    wave_size = pool_size(workers)
+    with ProcessPoolExecutor(max_workers=wave_size, initializer=init_worker) as pool:
+        for _ in range(count):
+            solution = random_solution(size, rng)
+            yield remove_clues(solution, rng, pool, wave_size, max_nodes), solution
+
+
+def format_grid(grid: Grid, indent: str = "    ") -> str:
+    rows = ",\n".join(f"{indent * 2}[{', '.join(map(str, row))}]" for row in grid)
+    return f"{indent}[\n{rows}\n{indent}]"
+
+
+def write_pairs(pairs: Iterator[Tuple[Grid, Grid]], output: IO[str]) -> int:
+    """Writes the pairs as a `puzzle.json` array, flushing after each one."""
+    written = 0
+    output.write("[")
+    for puzzle, solution in pairs:
+        separator = ",\n" if written else "\n"
+        output.write(f"{separator}{format_grid(puzzle)},\n{format_grid(solution)}")
+        output.flush()
+        written += 1
+    output.write("\n]\n")
+    output.flush()
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate unique puzzles.")
+    parser.add_argument("-n", "--count", type=int, default=10)
+    parser.add_argument("-s", "--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--max-nodes",
+        type=int,
+        default=DEFAULT_MAX_NODES,
+        help="search nodes per uniqueness check, 0 for no limit",
+    )
+    parser.add_argument(
+        "-o", "--output", default="-", help="JSON file, - for stdout"
+    )
+    args = parser.parse_args(argv)
+
+    if args.output == "-":
+        output = sys.stdout
+    else:
+        output = open(args.output, "w", encoding="utf-8")
+    try:
+        start = time.perf_counter()
+        written = write_pairs(
+            generate(
+                args.count,
+                args.size,
+                args.workers,
+                args.seed,
+                args.max_nodes or None,
+            ),
+            output,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print(f"{written} puzzles in {elapsed:.2f} seconds", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,343 @@
+import collections
+from typing import Optional
+
+from domains import range_mask, value_bit
+from propagation import CELL, GROUP, Conflict
+from vectorized import adjacent_values
+
+_MISSING = object()
+
+
+class IncrementalStateMixin:
+    """Keeps `unfilled_groups` and `possible_values` up to date cell by cell.
+
+    `_refresh_state` rebuilds everything from the whole board. In incremental
+    mode the solver instead splits the candidates into sources (the reach of
+    every unfilled group, the value of every empty pocket and the value 1 of
+    single cells) and only recomputes the sources a changed cell can affect.
+    Candidates of a cell are the bitset union of its sources minus the values
+    its neighbours forbid.
+    Every change is written to an undo trail, so resetting a cell restores the
+    previous groups and candidates without recomputing them.
+    """
+
+    incremental = False
+    vectorized = False
+    group_class: Optional[type] = None
+    _queue = None
+
+    def _set_cell(self, cell, value):
+        self.field_state.set_state(cell, value)
+        if not self.incremental:
+            self._check_group_size()
+            return
+
+        self._frames.append(len(self._trail))
+        self._update_after_assignment(cell, value)
+        self._check_incremental_group_size()
+
+    def _reset_cell(self, cell):
+        self.field_state.set_state(cell, 0)
+        if self.incremental:
+            self._undo(self._frames.pop())
+
+    def _invalid_mask(self, cell):
+        mask = 0
+        for n in self.field_state.field.get_neighbour_cells(cell):
+            n_value = self.field_state.get_state(n)
+            if n_value != 0:
+                mask |= 0b101 << (n_value - 1)  # Adding adjacent values
+        return mask
+
+    def _adjacent_values(self):
+        """Per cell id, the bitset of the values of the cell's neighbours.
+
+        With `vectorized`, NumPy computes it for the whole board at once,
+        see `vectorized.py`.
+        """
+        if self.vectorized:
+            masks = adjacent_values(self.field_state)
+            if masks is not None:
+                return masks
+        field = self.field_state.field
+        get_value = self.field_state.get_value
+        masks = []
+        for cell_id in range(field.cells_count()):
+            mask = 0
+            for n in field.get_neighbour_ids(cell_id):
+                mask |= value_bit(get_value(n))
+            masks.append(mask & ~value_bit(0))
+        return masks
+
+    def _breaks_invalid_masks(self):
+        """Whether a filled cell holds a value its neighbours rule out.
+
+        The search only sets candidates, but the clues can already break the
+        rule, so every leaf of the search is checked before it counts as a
+        solution.
+        """
+        get_value = self.field_state.get_value
+        return any(
+            get_value(cell_id) and _ruled_out(mask) >> get_value(cell_id) & 1
+            for cell_id, mask in enumerate(self._adjacent_values())
+        )
+
+    def _add_possible_values(self, cell, mask):
+        # What the neighbours rule out is removed by `_add_cell_sources`.
+        self.possible_values[cell] |= mask
+
+    def _add_cell_sources(self):
+        """Adds the value 1 and the pocket values to the candidates of the
+        empty cells, then removes from all candidates the values their
+        neighbours rule out. The last step of `_refresh_state`."""
+        adjacent = self._adjacent_values()
+        field = self.field_state.field
+        get_value = self.field_state.get_value
+        involved = set()
+        for cell_id, mask in enumerate(adjacent):
+            if get_value(cell_id) != 0:
+                continue
+            cell = field.get_cell(cell_id)
+            if not mask & value_bit(1):
+                self.possible_values[cell] |= value_bit(1)
+            if cell not in involved:
+                empty_group = self.field_state.get_involved(cell)
+                involved.update(empty_group)
+                pocket_masks = self._pocket_masks(empty_group, adjacent)
+                for c, pocket_mask in pocket_masks.items():
+                    self.possible_values[c] |= pocket_mask
+
+        for cell, mask in self.possible_values.items():
+            self.possible_values[cell] = mask & ~_ruled_out(
+                adjacent[field.cell_id(cell)]
+            )
+
+    def _can_hold_one(self, cell):
+        return all(
+            self.field_state.get_state(n) != 1
+            for n in self.field_state.field.get_neighbour_cells(cell)
+        )
+
+    def _pocket_masks(self, empty_group, adjacent_values=None):
+        # A value from 2 up to the pocket size fits every cell of the pocket
+        # that does not touch that value, if there are enough such cells.
+        base = range_mask(2, len(empty_group))
+        adjacent = {}
+        adjacent_count = collections.Counter()
+        for cell in empty_group:
+            if adjacent_values is not None:
+                mask = adjacent_values[self.field_state.field.cell_id(cell)]
+            else:
+                mask = 0
+                for n in self.field_state.field.get_neighbour_cells(cell):
+                    mask |= value_bit(self.field_state.get_state(n))
+            adjacent[cell] = mask & base
+            while mask:
+                low = mask & -mask
+                adjacent_count[low] += 1
+                mask ^= low
+
+        for bit, count in adjacent_count.items():
+            if len(empty_group) - count < bit.bit_length() - 1:
+                base &= ~bit
+        return {
+            cell: base & ~mask if mask else base for cell, mask in adjacent.items()
+        }
+
+    def _init_incremental_state(self):
+        self._trail = []
+        self._frames = []
+        self._find_unfilled_groups()
+        self._groups = []
+        self._reach = {}
+        self._pocket_of = {}
+        self._pocket_mask = {}
+        self._ones = {}
+        self._group_counts = collections.defaultdict(dict)
+
+        for group in self.unfilled_groups.values():
+            if group not in self._reach:
+                self._groups.append(group)
+                self._add_group_reach(group)
+
+        empty_cells = [
+            c
+            for c in self.field_state.field.get_all_cells()
+            if self.field_state.get_state(c) == 0
+        ]
+        for cell in empty_cells:
+            self._ones[cell] = self._can_hold_one(cell)
+            if cell not in self._pocket_of:
+                self._add_pocket(frozenset(self.field_state.get_involved(cell)))
+
+        for cell in empty_cells:
+            self._refresh_possible_values(cell)
+        self._trail = []
+
+    def _update_after_assignment(self, cell, value):
+        merged = self.field_state.get_involved(cell)
+        neighbours = [cell, *self.field_state.field.get_neighbour_cells(cell)]
+        changed_cells = set(neighbours)
+        changed_cells.update(self._regroup(cell, value, merged))
+        changed_cells.update(self._split_pocket(cell))
+        for c in neighbours:
+            self._refresh_one(c)
+        for c in changed_cells:
+            self._refresh_possible_values(c)
+
+    def _regroup(self, cell, value, merged):
+        """Finds again the groups the new value can change; returns the cells
+        whose candidates they gave or now give."""
+        merged_cells = set(merged)
+        affected = [
+            group
+            for group in self._groups
+            if cell in self._reach[group][1]
+            or (
+                group.get_value() == value
+                and not merged_cells.isdisjoint(self._reach[group][1])
+            )
+        ]
+        changed_cells = set()
+        new_groups = [group for group in self._groups if group not in affected]
+        for group in affected:
+            changed_cells.update(self._reach[group][0])
+            self._remove_group_reach(group)
+
+        if len(merged) > value:
+            raise Conflict("Wrong group size", cells=merged)
+
+        recomputed = []
+        if len(merged) < value:
+            recomputed.append(self._new_group(value, merged))
+        recomputed += [
+            self._new_group(group.get_value(), group.initial_cells)
+            for group in affected
+            if merged_cells.isdisjoint(group.initial_cells)
+        ]
+        for group in recomputed:
+            self._add_group_reach(group)
+            changed_cells.update(self._reach[group][0])
+        self._trail_replace("_groups", new_groups + recomputed)
+        return changed_cells
+
+    def _split_pocket(self, cell):
+        """Replaces the empty pocket of the cell by the pockets left around
+        it; returns the cells of all of them."""
+        pocket = self._pocket_of[cell]
+        for c in pocket:
+            self._trail_del(self._pocket_of, c)
+        self._trail_set(self._pocket_mask, cell, 0)
+        changed_cells = set(pocket)
+        for n in self.field_state.field.get_neighbour_cells(cell):
+            if self.field_state.get_state(n) == 0 and n not in self._pocket_of:
+                empty_group = frozenset(self.field_state.get_involved(n))
+                changed_cells.update(self._add_pocket(empty_group))
+        return changed_cells
+
+    def _check_incremental_group_size(self):
+        for group in self._groups:
+            if (
+                group.get_possible_length() < group.get_value()
+                and not group.possible_connection_cells
+            ):
+                raise Conflict("Wrong group size", reasons=[(GROUP, group)])
+
+    def _new_group(self, value, initial_cells):
+        group = self.group_class(value, initial_cells)
+        for c in initial_cells:
+            self._trail_set(self.unfilled_groups, c, group)
+        return group
+
+    def _add_group_reach(self, group):
+        # `_find_possible_values` also fills `possible_values` as it goes. Here
+        # candidates are derived from the sources, so those writes go to a
+        # scratch dict instead of the trailed one. The reach only has to be
+        # found again when one of the cells it was found from changes.
+        possible_values = self.possible_values
+        self.possible_values = collections.defaultdict(int)
+        try:
+            footprint = self._find_possible_values(group)
+        finally:
+            self.possible_values = possible_values
+
+        cells = frozenset(
+            group.possible_cells
+            + group.possible_connection_cells
+            + group.possible_merge_cells
+        )
+        self._trail_set(self._reach, group, (cells, frozenset(footprint)))
+        if self._queue is not None:
+            self._queue.push(GROUP, group)
+        for c in cells:
+            self._change_count(c, group.get_value(), 1)
+
+    def _remove_group_reach(self, group):
+        for c in self._reach[group][0]:
+            self._change_count(c, group.get_value(), -1)
+        self._trail_del(self._reach, group)
+        for c in group.initial_cells:
+            if self.unfilled_groups.get(c) is group:
+                self._trail_del(self.unfilled_groups, c)
+
+    def _add_pocket(self, pocket):
+        for c in pocket:
+            self._trail_set(self._pocket_of, c, pocket)
+        for c, mask in self._pocket_masks(pocket).items():
+            self._trail_set(self._pocket_mask, c, mask)
+        return pocket
+
+    def _refresh_one(self, cell):
+        can_hold_one = (
+            self.field_state.get_state(cell) == 0 and self._can_hold_one(cell)
+        )
+        if self._ones.get(cell, False) != can_hold_one:
+            self._trail_set(self._ones, cell, can_hold_one)
+
+    def _refresh_possible_values(self, cell):
+        if self.field_state.get_state(cell) != 0:
+            if cell in self.possible_values:
+                self._trail_del(self.possible_values, cell)
+            return
+        mask = self._pocket_mask.get(cell, 0)
+        if self._ones.get(cell, False):
+            mask |= value_bit(1)
+        for value, count in self._group_counts[cell].items():
+            if count:
+                mask |= value_bit(value)
+        mask &= ~self._invalid_mask(cell)
+        if self.possible_values.get(cell) != mask:
+            self._trail_set(self.possible_values, cell, mask)
+            if self._queue is not None:
+                self._queue.push(CELL, cell)
+
+    def _change_count(self, cell, value, delta):
+        counts = self._group_counts[cell]
+        self._trail_set(counts, value, counts.get(value, 0) + delta)
+
+    def _trail_set(self, mapping, key, value):
+        self._trail.append((mapping, key, mapping.get(key, _MISSING)))
+        mapping[key] = value
+
+    def _trail_del(self, mapping, key):
+        self._trail.append((mapping, key, mapping.pop(key)))
+
+    def _trail_replace(self, attr, value):
+        self._trail.append((self, attr, getattr(self, attr)))
+        setattr(self, attr, value)
+
+    def _undo(self, mark):
+        while len(self._trail) > mark:
+            target, key, old = self._trail.pop()
+            if target is self:
+                setattr(self, key, old)
+            elif old is _MISSING:
+                del target[key]
+            else:
+                target[key] = old
+
+
+def _ruled_out(adjacent):
+    # A cell cannot hold a value one above or below a neighbour's, the same
+    # values `_invalid_mask` adds one neighbour at a time.
+    return adjacent >> 1 | adjacent << 1
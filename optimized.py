@@ -1,88 +1,10 @@
 import collections
-import time
 
-
-class Field:
-    def __init__(self, size):
-        self.check_size(size)
-        self._size = size
-
-    @staticmethod
-    def check_size(size):
-        if type(size) is not int:
-            raise TypeError("Field size should be an integer")
-
-        if size < 2:
-            raise ValueError("Minimum field size is 2")
-
-    def size(self):
-        return self._size
-
-    def get_all_cells(self):
-        for x in range(self._size):
-            for y in range(self._size):
-                yield x, y
-
-    def get_neighbour_cells(self, cell):
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbour_cell = (cell[0] + dx, cell[1] + dy)
-            if (0 <= neighbour_cell[0] < self._size) and (
-                0 <= neighbour_cell[1] < self._size
-            ):
-                yield neighbour_cell
-
-
-class FieldState:
-    def __init__(self, field):
-        self.field = field
-        self._state = collections.defaultdict(lambda: 0)
-
-    def __str__(self):
-        result = ""
-        for x in range(self.field.size()):
-            row = ""
-            for y in range(self.field.size()):
-                row += str(self._state[(x, y)]) + " "
-            result += row + "\n"
-        return result
-
-    @staticmethod
-    def from_list_to_state(matrix):
-        size = len(matrix)
-        field = Field(size)
-        state = FieldState(field)
-
-        for x in range(size):
-            for y in range(size):
-                state.set_state((x, y), matrix[x][y])
-
-        return state
-
-    def set_state(self, coords, value):
-        if value < 0:
-            raise ValueError("Value should be non-negative")
-
-        if type(value) is not int:
-            raise TypeError("Value should be an integer")
-        self._state[coords] = value
-
-    def get_state(self, coords):
-        return self._state[coords]
-
-    def get_involved(self, cell):
-        involved = [cell]
-        value = self._state[cell]
-        not_checked = [cell]
-
-        while not_checked:
-            cell = not_checked.pop()
-
-            for neighbour in self.field.get_neighbour_cells(cell):
-                if neighbour not in involved and self._state[neighbour] == value:
-                    involved.append(neighbour)
-                    not_checked.append(neighbour)
-
-        return involved
+from branching import GROUP, BranchingMixin
+from domains import value_bit
+from field import Field, FieldState  # noqa: F401
+from incremental import IncrementalStateMixin
+from reach import find_reach
 
 
 class CellsGroup:
@@ -91,6 +13,7 @@ class CellsGroup:
         self.initial_cells = initial_cells
         self.possible_cells = []
         self.possible_connection_cells = []
+        self.possible_merge_cells = []
 
     def get_value(self):
         return self.value
@@ -111,14 +34,18 @@ class CellsGroup:
             self.possible_connection_cells.append(cell)
 
 
-class PuzzleSolver:
+class PuzzleSolver(IncrementalStateMixin, BranchingMixin):
     possible_values: collections.defaultdict
-    involved: list = []
+    involved: set = set()
     unfilled_groups: dict = {}
+    group_class = CellsGroup
 
-    def __init__(self, field_state):
+    def __init__(self, field_state, incremental=True, branching=GROUP):
         self.field_state = field_state
         self.state_changed = True
+        self.incremental = incremental
+        self.branching = branching
+        self.nodes = 0
 
     def solve(self):
         self._refresh_state()
@@ -126,55 +53,16 @@ class PuzzleSolver:
 
     def _refresh_state(self):
         self._find_unfilled_groups()
-        for cell in filter(
-            lambda c: self.field_state.get_state(c) != 0 and c in self.unfilled_groups,
-            self.field_state.field.get_all_cells(),
-        ):
-            self._find_possible_values(cell)
-
-        empty_cells = list(
-            filter(
-                lambda c: self.field_state.get_state(c) == 0,
-                self.field_state.field.get_all_cells(),
-            )
-        )
-
-        involved = set()
-        for cell in empty_cells:
-            if all(
-                self.field_state.get_state(n) != 1
-                for n in self.field_state.field.get_neighbour_cells(cell)
-            ):
-                self._add_possible_value(cell, 1)
-
-            if cell not in involved:
-                empty_group = self.field_state.get_involved(cell)
-                involved = involved.union(empty_group)
-                self._find_additional_values(empty_group)
+        for group in dict.fromkeys(self.unfilled_groups.values()):
+            self._find_possible_values(group)
 
+        self._add_cell_sources()
         self.state_changed = True
 
-    def _find_additional_values(self, empty_group):
-        for value in range(2, min(len(empty_group) + 1, 10)):
-            involved_for_value = set(empty_group)
-            not_possible_cells = set()
-
-            for involved in involved_for_value:
-                if any(
-                    self.field_state.get_state(n) == value
-                    for n in self.field_state.field.get_neighbour_cells(involved)
-                ):
-                    not_possible_cells.add(involved)
-            involved_for_value -= not_possible_cells
-
-            if value <= len(involved_for_value):
-                for cell in involved_for_value:
-                    self._add_possible_value(cell, value)
-
     def _find_unfilled_groups(self):
         self.unfilled_groups = {}
-        self.involved = []
-        self.possible_values = collections.defaultdict(lambda: [])
+        self.involved = set()
+        self.possible_values = collections.defaultdict(int)
 
         for cell in filter(
             lambda x: self.field_state.get_state(x) != 0,
@@ -182,7 +70,7 @@ class PuzzleSolver:
         ):
             if cell not in self.involved:
                 initial_cells = self.field_state.get_involved(cell)
-                self.involved += initial_cells
+                self.involved.update(initial_cells)
                 value = self.field_state.get_state(cell)
 
                 if len(initial_cells) < value:
@@ -193,96 +81,52 @@ class PuzzleSolver:
                 if len(initial_cells) > value:
                     raise ValueError("Wrong group size")
 
-    def _find_possible_values(self, cell):
-        next_cells = [(cell, 0)]
-        value = self.field_state.get_state(cell)
-        previous_cells = []
-        group = self.unfilled_groups[cell]
-
-        while next_cells:
-            current_cell, current_length = next_cells.pop()
-            previous_cells.append(current_cell)
-
-            way_length = current_length + len(group.initial_cells)
-
-            if way_length < value and current_cell != cell:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
-
-            elif way_length == value:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
-                continue
-
-            free_neighbours = filter(
-                lambda n: self.field_state.get_state(n) == 0
-                and n not in previous_cells,
-                self.field_state.field.get_neighbour_cells(current_cell),
-            )
-
-            for neighbour in free_neighbours:
-                if any(
-                    self._connection_cells_found(n, neighbour, group)
-                    for n in self.field_state.field.get_neighbour_cells(neighbour)
-                ):
-                    continue
-
-                next_cells.append((neighbour, current_length + 1))
-
-    def _connection_cells_found(self, neighbour, cell, group):
+    def _find_possible_values(self, group):
         value = group.get_value()
-
-        if (
-            self.field_state.get_state(neighbour) == value
-            and neighbour not in group.initial_cells
-            and neighbour not in group.possible_cells
-        ):
-            self.field_state.set_state(cell, value)
-            intersection_length = len(self.field_state.get_involved(cell))
-            self.field_state.set_state(cell, 0)
-
-            if intersection_length <= value:
-                group.add_connection(cell)
-                self._add_possible_value(cell, value)
-            return True
-
-        return False
+        reach = find_reach(self.field_state, value, group.initial_cells)
+        for cell in reach.distances:
+            self._add_possible_value(cell, value)
+            group.add_possible_cell(cell)
+        for cell in reach.connections:
+            self._add_possible_value(cell, value)
+            group.add_connection(cell)
+        return reach.footprint
 
     def _add_possible_value(self, cell, value):
-        if value not in self.possible_values[cell]:
-            for n in self.field_state.field.get_neighbour_cells(cell):
-                n_value = self.field_state.get_state(n)
-                if n_value != 0 and abs(n_value - value) == 1:
-                    break  # Value conflicts with adjacent cell
-            else:
-                self.possible_values[cell].append(value)
+        self._add_possible_values(cell, value_bit(value))
 
     def _try_fill_empty_cells(self):
-        def backtrack():
-            if not free_cells:
-                return True
-            cell = free_cells.pop()
-            possible_values[cell] = self.possible_values[cell]
-            for value in possible_values[cell]:
-                self.field_state.set_state(cell, value)
-                try:
-                    self._check_group_size()
-                    if backtrack():
-                        return True
-                except ValueError:
-                    pass
-                self.field_state.set_state(cell, 0)
-            free_cells.append(cell)
-            return False
-
-        free_cells = list(
+        free_cells = set(
             filter(
                 lambda c: self.field_state.get_state(c) == 0,
                 self.field_state.field.get_all_cells(),
             )
         )
-        possible_values = self.possible_values
-        backtrack()
+        if self.incremental:
+            self._init_incremental_state()
+        self._backtrack(free_cells, {})
+
+    def _backtrack(self, free_cells, excluded):
+        alternatives = self._choose_branch(free_cells, excluded)
+        if alternatives is None:
+            return True
+        tried = []
+        for cell, value in alternatives:
+            self.nodes += 1
+            free_cells.discard(cell)
+            try:
+                self._set_cell(cell, value)
+                if self._backtrack(free_cells, excluded):
+                    return True
+            except ValueError:
+                pass
+            self._reset_cell(cell)
+            free_cells.add(cell)
+            self._exclude(excluded, cell, value)
+            tried.append((cell, value))
+        for cell, value in tried:
+            self._include(excluded, cell, value)
+        return False
 
     def _check_group_size(self):
         self._refresh_state()
@@ -323,15 +167,10 @@ rows_3 = [
     [4, 0, 0, 0, 0, 0],
     [0, 3, 0, 0, 2, 0],
 ]
-start_time = time.time()
-
-state = FieldState.from_list_to_state(rows_3)
-solver = PuzzleSolver(state)
-print(solver.field_state)
-solver.solve()
-print(solver.field_state)
-
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print("Time taken to solve the puzzle:", elapsed_time, "seconds")
+if __name__ == "__main__":
+    state = FieldState.from_list_to_state(rows_3)
+    solver = PuzzleSolver(state)
+    print(solver.field_state)
+    solver.solve()
+    print(solver.field_state)
@@ -0,0 +1,230 @@
+import collections
+
+from field import FieldState
+
+ASSIGN = "assign"
+EXCLUDE = "exclude"
+
+# Subproblems to expand the top of the tree into, per worker.
+SPLIT_FACTOR = 4
+MAX_SPLIT_DEPTH = 8
+# Nodes a worker spends on a subproblem before handing the rest back.
+SPLIT_NODES = 2000
+
+
+class ParallelSearchMixin:
+    """Backtracking search spread over a process pool.
+
+    The top levels of the search tree are expanded into subproblems, each a
+    list of moves from the root: `(ASSIGN, cell, value)` for the branch
+    taken and `(EXCLUDE, cell, value)` for the alternatives tried before it
+    at the same node. Replaying them gives exactly the node the sequential
+    search would reach, so the subproblems split the tree without overlap
+    and counting in parallel finds the same solutions.
+
+    A worker that spends `SPLIT_NODES` nodes on a subproblem stops and
+    returns the alternatives it has not tried yet as new subproblems, which
+    go to the front of the queue for the idle workers. The pool is killed as
+    soon as `limit` solutions are found, or once the workers have spent
+    `max_nodes` nodes together, which clears `complete`.
+    """
+
+    def _search_parallel(self, rows, workers, limit=None, max_nodes=None):
+        """Solutions found by the pool; `rows` is the board before propagation."""
+        solutions, pending = self._split_tree(workers, limit)
+        if pending:
+            self._run_pool(rows, workers, pending, solutions, limit, max_nodes)
+        return solutions if limit is None else solutions[:limit]
+
+    def _split_tree(self, workers, limit):
+        """Solutions above the cut and the subproblems below it.
+
+        The cut goes one level deeper until there are enough subproblems
+        for the workers; no subproblems are left once `limit` solutions
+        turn up above it.
+        """
+        nodes = self.nodes
+        for depth in range(1, MAX_SPLIT_DEPTH + 1):
+            self.nodes = nodes
+            solutions = []
+            pending = []
+            free_cells, excluded = self._free_cells(), {}
+            if self.incremental:
+                self._init_incremental_state()
+            if self._explore(
+                free_cells,
+                excluded,
+                [],
+                lambda d: d >= depth,  # noqa: B023
+                _solution_recorder(self, solutions, limit),
+                pending,
+            ):
+                return solutions, []
+            if len(pending) >= workers * SPLIT_FACTOR:
+                break
+        return solutions, pending
+
+    def _run_pool(self, rows, workers, pending, solutions, limit, max_nodes):
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+        from batch import init_worker, kill_pool, pool_size
+
+        pending = collections.deque(pending)
+        options = {
+            "incremental": self.incremental,
+            "branching": self.branching,
+            "backjumping": self.backjumping,
+            "vectorized": self.vectorized,
+        }
+        workers = pool_size(workers)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        running = set()
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    running.add(
+                        executor.submit(
+                            search_subproblem,
+                            type(self),
+                            rows,
+                            options,
+                            pending.popleft(),
+                            limit,
+                            self._subproblem_budget(max_nodes),
+                        )
+                    )
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    found, leftover, nodes = future.result()
+                    self.nodes += nodes
+                    solutions.extend(found)
+                    pending.extendleft(reversed(leftover))
+                if self._pool_done(solutions, limit, max_nodes, pending or running):
+                    kill_pool(executor)
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _subproblem_budget(self, max_nodes):
+        if max_nodes is None:
+            return SPLIT_NODES
+        return min(SPLIT_NODES, max(max_nodes - self.nodes, 1))
+
+    def _pool_done(self, solutions, limit, max_nodes, unfinished):
+        """Whether to stop the pool; clears `complete` if it stops early."""
+        if limit is not None and len(solutions) >= limit:
+            return True
+        if max_nodes is not None and self.nodes >= max_nodes:
+            self.complete = not unfinished
+            return True
+        return False
+
+    def _explore(
+        self, free_cells, excluded, path, cut, on_solution, frontier, depth=0
+    ):
+        """Depth-first search that leaves the branches `cut` rules out.
+
+        `cut` gets the depth of a node; every alternative it is true for is
+        appended to `frontier` as a list of moves instead of being searched.
+        Returns True once `on_solution` does.
+        """
+        alternatives = self._choose_branch(free_cells, excluded)
+        if alternatives is None:
+            return not self._breaks_invalid_masks() and on_solution()
+        tried = []
+        for cell, value in alternatives:
+            moves = path + [(EXCLUDE, c, v) for c, v in tried] + [(ASSIGN, cell, value)]
+            if cut(depth):
+                frontier.append(moves)
+            elif self._explore_move(
+                free_cells, excluded, moves, cut, on_solution, frontier, depth
+            ):
+                return True
+            self._exclude(excluded, cell, value)
+            tried.append((cell, value))
+        for cell, value in tried:
+            self._include(excluded, cell, value)
+        return False
+
+    def _explore_move(
+        self, free_cells, excluded, moves, cut, on_solution, frontier, depth
+    ):
+        """Searches below the last move of `moves`, then takes it back."""
+        _, cell, value = moves[-1]
+        self.nodes += 1
+        assigned = [cell]
+        free_cells.discard(cell)
+        try:
+            self._set_cell(cell, value)
+            self._propagate(excluded, assigned, free_cells)
+            if self._explore(
+                free_cells, excluded, moves, cut, on_solution, frontier, depth + 1
+            ):
+                return True
+        except ValueError:
+            pass
+        for c in reversed(assigned):
+            self._reset_cell(c)
+            free_cells.add(c)
+        return False
+
+    def _replay(self, moves):
+        """Free cells and exclusions at the node `moves` lead to.
+
+        Raises `ValueError` if propagation rules the node out.
+        """
+        free_cells, excluded = self._free_cells(), {}
+        if self.incremental:
+            self._init_incremental_state()
+        for kind, cell, value in moves:
+            if kind == EXCLUDE:
+                self._exclude(excluded, cell, value)
+                continue
+            free_cells.discard(cell)
+            self._set_cell(cell, value)
+            self._propagate(excluded, [cell], free_cells)
+        return free_cells, excluded
+
+    def _free_cells(self):
+        return {
+            cell
+            for cell in self.field_state.field.get_all_cells()
+            if self.field_state.get_state(cell) == 0
+        }
+
+
+def search_subproblem(solver_class, rows, options, moves, limit, budget):
+    """Searches one subproblem in a worker process.
+
+    Returns the solutions found, the subproblems left after `budget` nodes
+    and the number of nodes.
+    """
+    solver = solver_class(FieldState.from_list_to_state(rows), **options)
+    solutions = []
+    leftover = []
+    if not solver._propagate_root():
+        return solutions, leftover, solver.nodes
+    try:
+        free_cells, excluded = solver._replay(moves)
+    except ValueError:
+        return solutions, leftover, solver.nodes
+    solver._explore(
+        free_cells,
+        excluded,
+        moves,
+        lambda depth: solver.nodes >= budget,
+        _solution_recorder(solver, solutions, limit),
+        leftover,
+    )
+    return solutions, leftover, solver.nodes
+
+
+def _solution_recorder(solver, solutions, limit):
+    """`on_solution` that appends the board to `solutions`; it stops the
+    search once there are `limit` of them."""
+
+    def record_solution():
+        solutions.append(solver._rows())
+        return limit is not None and len(solutions) >= limit
+
+    return record_solution
@@ -0,0 +1,249 @@
+"""Fillomino as exact cover over polyomino placements.
+
+Every incomplete clued region of value `n` has to end up inside exactly one
+polyomino of `n` cells. The engine enumerates those placements once per
+puzzle against the `FieldState`: a placement only uses empty cells and
+cells holding `n`, and it may not touch a cell outside it that already
+holds `n` (a wall), as the two would merge into a larger region. So a
+placement either takes in another region of the same value whole, covering
+its clue too, or keeps away from it. Like the backtracking solver, it may
+not touch a cell holding `n - 1` or `n + 1` either.
+
+Algorithm X then picks one placement per clued region, with the clued
+regions as primary items and the empty cells as secondary ones. Two chosen
+placements may not touch each other if their values are equal or one
+apart; every edge on the outline of a placement is a secondary item per
+pair of neighbouring values it can take part in, which keeps them apart
+inside the cover search itself. The cells no placement covers are split
+into regions of any size afterwards, under the same rules; if that fails
+the cover search goes on.
+
+The enumeration grows quickly with the values of the clues, so on large
+boards with large clues this engine is much slower than backtracking.
+
+Placements of up to `SHAPE_CACHE_LIMIT` cells come from a cache of every
+fixed polyomino shape by the offset of its anchor cell, so enumerating
+them is a filter over translated shapes. Larger ones are grown on the
+board directly, where the walls keep the count manageable.
+"""
+
+import functools
+
+from dlx import DancingLinks
+from field import region_cells
+
+SHAPE_CACHE_LIMIT = 8
+
+
+@functools.lru_cache(maxsize=None)
+def fixed_polyominoes(size):
+    """Every polyomino of `size` cells up to translation, as sorted offsets."""
+    if size == 1:
+        return (((0, 0),),)
+    shapes = set()
+    for shape in fixed_polyominoes(size - 1):
+        cells = set(shape)
+        for x, y in shape:
+            for cell in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if cell not in cells:
+                    shapes.add(_normalize(cells | {cell}))
+    return tuple(sorted(shapes))
+
+
+@functools.lru_cache(maxsize=None)
+def anchored_shapes(size):
+    """Every fixed polyomino of `size` cells, once per cell of it.
+
+    Each entry lists the offsets of the shape's cells from that anchor
+    cell, so translating it to a cell gives every placement covering it.
+    """
+    return tuple(
+        tuple((x - ax, y - ay) for x, y in shape)
+        for shape in fixed_polyominoes(size)
+        for ax, ay in shape
+    )
+
+
+def _normalize(cells):
+    min_x = min(x for x, _ in cells)
+    min_y = min(y for _, y in cells)
+    return tuple(sorted((x - min_x, y - min_y) for x, y in cells))
+
+
+class PlacementSolver:
+    def __init__(self, field_state):
+        self.field_state = field_state
+        self.field = field_state.field
+        self.size = self.field.size()
+
+    def solve(self):
+        """Fills the board in place; returns False if it has no solution."""
+        board = {
+            cell: self.field_state.get_state(cell)
+            for cell in self.field.get_all_cells()
+        }
+        regions = self._incomplete_regions(board)
+        if regions is None:
+            return False
+        links = self._links(board, regions)
+        for chosen in links.search():
+            painted = dict(board)
+            for option in chosen:
+                value, cells = links.options[option]
+                for cell in cells:
+                    painted[cell] = value
+            if self._fill_pockets(painted):
+                for cell, value in painted.items():
+                    self.field_state.set_state(cell, value)
+                return True
+        return False
+
+    def _links(self, board, regions):
+        """The cover problem of choosing one placement per clued region."""
+        placements = {
+            (value, cells)
+            for value, region in regions
+            for cells in self._placements(board, value, region)
+        }
+        options = []
+        edges = set()
+        for value, cells in placements:
+            boundary = self._boundary_edges(cells, value)
+            edges.update(boundary)
+            items = [r for r in regions if r[0] == value and r[1] <= cells]
+            items += [c for c in cells if board[c] == 0]
+            options.append(((value, cells), items + boundary))
+
+        empty = [cell for cell, value in board.items() if value == 0]
+        links = DancingLinks(regions, empty + sorted(edges))
+        for data, items in options:
+            links.add_option(items, data)
+        return links
+
+    def _boundary_edges(self, cells, value):
+        """Items shared by every placement that may not touch this one.
+
+        An edge between a covered and an uncovered cell becomes the items
+        `(edge, value - 1)` and `(edge, value)`, where `(edge, low)` stands
+        for the values `low` and `low + 1` meeting across it. A placement on
+        the other side of the edge with the same value, or one apart, needs
+        one of the same items, so the two are never chosen together.
+        """
+        return [
+            (min(cell, n), max(cell, n), low)
+            for cell in cells
+            for n in self.field.get_neighbour_cells(cell)
+            if n not in cells
+            for low in (value - 1, value)
+        ]
+
+    def _incomplete_regions(self, board):
+        """Clued regions still missing cells, or None if one is oversize or
+        touches a value one away from its own."""
+        regions = []
+        seen = set()
+        for cell, value in board.items():
+            if value == 0 or cell in seen:
+                continue
+            region = self._region(board, cell)
+            seen.update(region)
+            if len(region) > value:
+                return None
+            if self._touches(board, region, value - 1, value + 1):
+                return None
+            if len(region) < value:
+                regions.append((value, frozenset(region)))
+        return regions
+
+    def _region(self, board, start):
+        return region_cells(start, self.field.get_neighbour_cells, board.__getitem__)
+
+    def _placements(self, board, value, region):
+        if value <= SHAPE_CACHE_LIMIT:
+            candidates = self._translated_shapes(board, value, region)
+        else:
+            candidates = self._grow(region, value, lambda c: board[c] in (0, value))
+        for cells in candidates:
+            if not self._touches(board, cells, value - 1, value, value + 1):
+                yield cells
+
+    def _translated_shapes(self, board, value, region):
+        ax, ay = min(region)
+        for offsets in anchored_shapes(value):
+            cells = []
+            for dx, dy in offsets:
+                cell = (ax + dx, ay + dy)
+                if not (0 <= cell[0] < self.size and 0 <= cell[1] < self.size):
+                    break
+                if board[cell] not in (0, value):
+                    break
+                cells.append(cell)
+            else:
+                cells = frozenset(cells)
+                if region <= cells:
+                    yield cells
+
+    def _grow(self, seed, size, allowed):
+        """Every connected superset of `seed` with `size` cells (Redelmeier)."""
+        cells = list(seed)
+        seen = set(seed)
+        untried = []
+        for cell in seed:
+            for n in self.field.get_neighbour_cells(cell):
+                if n not in seen and allowed(n):
+                    seen.add(n)
+                    untried.append(n)
+        if len(cells) == size:
+            yield frozenset(cells)
+        elif len(cells) < size:
+            yield from self._extend(cells, seen, untried, size, allowed)
+
+    def _extend(self, cells, seen, untried, size, allowed):
+        untried = list(untried)
+        while untried:
+            cell = untried.pop()
+            cells.append(cell)
+            if len(cells) == size:
+                yield frozenset(cells)
+            else:
+                new = [
+                    n
+                    for n in self.field.get_neighbour_cells(cell)
+                    if n not in seen and allowed(n)
+                ]
+                seen.update(new)
+                yield from self._extend(cells, seen, untried + new, size, allowed)
+                seen.difference_update(new)
+            cells.pop()
+
+    def _touches(self, board, cells, *values):
+        """Whether a filled cell next to `cells` holds one of `values`."""
+        return any(
+            board[n] in values
+            for cell in cells
+            for n in self.field.get_neighbour_cells(cell)
+            if n not in cells and board[n]
+        )
+
+    def _fill_pockets(self, painted):
+        """Splits the uncovered cells into unclued regions, in place."""
+        free = [cell for cell, value in painted.items() if value == 0]
+        if not free:
+            return True
+        start = min(free)
+        pocket = self._region(painted, start)
+        for value in range(1, len(pocket) + 1):
+            for cells in self._grow([start], value, lambda c: painted[c] == 0):
+                if self._touches(painted, cells, value - 1, value, value + 1):
+                    continue
+                for cell in cells:
+                    painted[cell] = value
+                if self._fill_pockets(painted):
+                    return True
+                for cell in cells:
+                    painted[cell] = 0
+        return False
+
+
+def solve_with_placements(field_state):
+    return PlacementSolver(field_state).solve()
@@ -0,0 +1,134 @@
+import collections
+from typing import Tuple
+
+CELL = "cell"
+GROUP = "group"
+
+
+class Conflict(ValueError):
+    """Contradiction that names its cause, for backjumping.
+
+    `cells` hold values that cannot all stay, `reasons` are queue items
+    `(kind, item)`: the one whose candidates ran out, or the one a rule
+    deduced the clashing value for. `exclusions` are the `(cell, value)`
+    pairs excluded by the search that the contradiction needs.
+    """
+
+    def __init__(self, message, cells=(), reasons=(), exclusions=()):
+        super().__init__(message)
+        self.cells = cells
+        self.reasons = reasons
+        self.exclusions = exclusions
+
+
+class PropagationQueue:
+    """Work queue of cells and groups whose candidates changed."""
+
+    def __init__(self):
+        self._items = collections.deque()
+        self._queued = set()
+
+    def __bool__(self):
+        return bool(self._items)
+
+    def push(self, kind, item):
+        if (kind, item) not in self._queued:
+            self._queued.add((kind, item))
+            self._items.append((kind, item))
+
+    def pop(self):
+        kind, item = self._items.popleft()
+        self._queued.discard((kind, item))
+        return kind, item
+
+    def clear(self):
+        self._items.clear()
+        self._queued.clear()
+
+
+class PropagationMixin:
+    """Runs the deduction rules to a fixpoint, driven by a work queue.
+
+    Each rule subscribes either to cells (`cell_rules`) or to unfilled groups
+    (`group_rules`) and only runs for the items that are queued. In
+    incremental mode the state update queues exactly the cells whose
+    candidates changed and the groups whose reach was recomputed; otherwise
+    every assignment rebuilds the whole state, so everything is queued again.
+
+    A rule deduces assignments through `_deduce`. A rule that finds a
+    contradiction raises `ValueError`, like a failed group size check does;
+    so does deducing a value the search excluded, which keeps the branches
+    of a node from finding the same solutions. Contradictions are raised as
+    `Conflict`, with the item being processed in `_reason` as their cause.
+    """
+
+    cell_rules: Tuple[str, ...] = ()
+    group_rules: Tuple[str, ...] = ()
+    _deps = None
+    _reason = None
+
+    def _schedule_everything(self):
+        for cell in self.field_state.field.get_all_cells():
+            if self.field_state.get_state(cell) == 0:
+                self._queue.push(CELL, cell)
+        for group in dict.fromkeys(self.unfilled_groups.values()):
+            self._queue.push(GROUP, group)
+
+    def _propagate(self, excluded, assigned, free_cells):
+        """Applies the rules until the queue is empty.
+
+        Every cell the rules set is appended to `assigned` before it is set,
+        so the caller can reset them all in reverse order, also after a
+        contradiction was raised.
+        """
+        self._propagation = (excluded, assigned, free_cells)
+        if not self.incremental:
+            self._schedule_everything()
+        try:
+            while self._queue:
+                kind, item = self._queue.pop()
+                if kind == CELL:
+                    if self.field_state.get_state(item) != 0:
+                        continue
+                    rules = self.cell_rules
+                else:
+                    if self.unfilled_groups.get(item.initial_cells[0]) is not item:
+                        continue
+                    rules = self.group_rules
+                self._reason = (kind, item)
+                for rule in rules:
+                    getattr(self, rule)(item, excluded)
+        finally:
+            self._queue.clear()
+            self._propagation = None
+
+    def _deduce(self, cell, value):
+        excluded, assigned, free_cells = self._propagation
+        current = self.field_state.get_state(cell)
+        if current == value:
+            return
+        if current != 0:
+            raise Conflict(
+                "Conflicting deductions", cells=[cell], reasons=[self._reason]
+            )
+        # The branch already tried this value here, so the subtree that
+        # needs it belongs to a sibling branch.
+        if excluded.get(cell, 0) >> value & 1:
+            raise Conflict(
+                "Excluded value",
+                reasons=[self._reason],
+                exclusions=[(cell, value)],
+            )
+        # Rules reason about group sizes only, so the value can still be one
+        # the neighbours rule out.
+        if not self._domain(cell, excluded) >> value & 1:
+            raise Conflict(
+                "Value not a candidate", reasons=[self._reason, (CELL, cell)]
+            )
+        assigned.append(cell)
+        free_cells.discard(cell)
+        if self._deps is not None:
+            self._record_deduction(cell)
+        self._set_cell(cell, value)
+        if not self.incremental:
+            self._schedule_everything()
@@ -0,0 +1,72 @@
+import collections
+
+
+class ReachMap:
+    """Empty cells an unfinished group can still grow into.
+
+    `distances` maps every such cell to its shortest distance from the
+    group through empty cells. The search stops at `radius`, the number of
+    cells the group still lacks, so no cell is farther than that. With
+    connections, an empty cell next to another region of the group's value
+    is not passed through: if the group can merge with it there without
+    getting too large, `connections` maps the cell to its distance and the
+    size of the merged region.
+
+    `footprint` holds the value of every cell the search looked at. The
+    map stays the same until one of these changes or a region of the
+    group's value next to one of them grows, so changes outside of its
+    radius never invalidate it.
+    """
+
+    def __init__(self, value, initial_cells):
+        self.value = value
+        self.initial_cells = initial_cells
+        self.radius = value - len(initial_cells)
+        self.distances = {}
+        self.connections = {}
+        self.footprint = {}
+
+
+def find_reach(field_state, value, initial_cells, connections=True):
+    """`ReachMap` of the group of `value` made of `initial_cells`.
+
+    A breadth-first search from all the group's cells at once, so every
+    cell gets its shortest distance and is visited once per group.
+    """
+    reach = ReachMap(value, initial_cells)
+    get_state = field_state.get_state
+    neighbours = field_state.field.get_neighbour_cells
+    footprint = reach.footprint
+    group = frozenset(initial_cells)
+    seen = set(group)
+    frontier = collections.deque((cell, 0) for cell in initial_cells)
+    while frontier:
+        cell, distance = frontier.popleft()
+        if distance == reach.radius:
+            continue
+        for n in neighbours(cell):
+            if n in seen:
+                continue
+            seen.add(n)
+            footprint[n] = n_value = get_state(n)
+            if n_value != 0:
+                continue
+            if connections and _touches_other_region(
+                reach, n, group, get_state, neighbours
+            ):
+                size = field_state.get_probe_size(n, value)
+                if size <= value:
+                    reach.connections[n] = (distance + 1, size)
+                continue
+            reach.distances[n] = distance + 1
+            frontier.append((n, distance + 1))
+    return reach
+
+
+def _touches_other_region(reach, cell, group, get_state, neighbours):
+    touches = False
+    for n in neighbours(cell):
+        reach.footprint[n] = n_value = get_state(n)
+        if n_value == reach.value and n not in group:
+            touches = True
+    return touches
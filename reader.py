@@ -0,0 +1,219 @@
+"""Streaming reader of puzzle files.
+
+A file holds JSON values one after another, each either a puzzle or an
+array of puzzles, so both a single JSON array and JSONL work. `//` and
+`/* */` comments are skipped. The file is read in chunks and only the
+puzzle being parsed is kept in memory.
+"""
+
+import json
+import re
+from typing import Callable, Dict, Iterator, List, TextIO, Tuple
+
+from constants import PUZZLE_FILE
+
+Puzzle = List[List[int]]
+
+CHUNK_SIZE = 1 << 16
+
+_CODE, _LINE_COMMENT, _BLOCK_COMMENT, _STRING = range(4)
+_COMMENT_START = re.compile(r'//|/\*|"')
+_STRING_TOKEN = re.compile(r'\\.|"', re.S)
+_ELEMENT_TOKEN = re.compile(r'[\[\],"]')
+_NESTED_TOKEN = re.compile(r'[\[\]"]')
+
+_EXPECTED_PUZZLE = "Expected a puzzle or an array of puzzles"
+
+
+def read_puzzles(file: str = PUZZLE_FILE) -> List[Puzzle]:
+    return list(iter_puzzles(file))
+
+
+def iter_puzzles(
+    file: str = PUZZLE_FILE, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Puzzle]:
+    """Yields the puzzles of a file one at a time."""
+    with open(file, "r", encoding="utf-8") as f:
+        splitter = _PuzzleSplitter()
+        for piece in _strip_comments(f, chunk_size):
+            yield from splitter.feed(piece)
+        splitter.finish()
+
+
+def _strip_comments(f: TextIO, chunk_size: int) -> Iterator[str]:
+    stripper = _CommentStripper()
+    carry = ""
+    while True:
+        chunk = f.read(chunk_size)
+        pieces, carry = stripper.strip(carry + chunk, eof=not chunk)
+        yield from pieces
+        if not chunk:
+            return
+
+
+def _held_back(text: str, eof: bool, char: str) -> int:
+    # A trailing "/", "*" or "\\" may start a two-character token that ends
+    # in the next chunk, so it is carried over unless at the end.
+    return len(text) - 1 if not eof and text.endswith(char) else len(text)
+
+
+# A step of `_CommentStripper` gets the text, the position and whether the
+# file ended, appends the code it passed to the pieces and returns the
+# position it stopped at and whether the text has more to scan.
+_Step = Callable[[str, int, bool, List[str]], Tuple[int, bool]]
+
+
+class _CommentStripper:
+    """Removes comments from text read a chunk at a time."""
+
+    def __init__(self) -> None:
+        self.state = _CODE
+        self._steps: Dict[int, _Step] = {
+            _CODE: self._code,
+            _LINE_COMMENT: self._line_comment,
+            _BLOCK_COMMENT: self._block_comment,
+            _STRING: self._string,
+        }
+
+    def strip(self, text: str, eof: bool) -> Tuple[List[str], str]:
+        """The code pieces of `text` and the rest to carry over."""
+        pieces: List[str] = []
+        pos = 0
+        more = True
+        while more and pos < len(text):
+            pos, more = self._steps[self.state](text, pos, eof, pieces)
+        return pieces, text[pos:]
+
+    def _code(
+        self, text: str, pos: int, eof: bool, pieces: List[str]
+    ) -> Tuple[int, bool]:
+        m = _COMMENT_START.search(text, pos)
+        if m is None:
+            end = _held_back(text, eof, "/")
+            pieces.append(text[pos:end])
+            return end, False
+        pieces.append(text[pos : m.start()])
+        if m.group() == '"':
+            pieces.append('"')
+            self.state = _STRING
+        else:
+            self.state = _LINE_COMMENT if m.group() == "//" else _BLOCK_COMMENT
+        return m.end(), True
+
+    def _line_comment(
+        self, text: str, pos: int, eof: bool, pieces: List[str]
+    ) -> Tuple[int, bool]:
+        end = text.find("\n", pos)
+        if end < 0:
+            return len(text), False
+        self.state = _CODE
+        return end, True
+
+    def _block_comment(
+        self, text: str, pos: int, eof: bool, pieces: List[str]
+    ) -> Tuple[int, bool]:
+        end = text.find("*/", pos)
+        if end < 0:
+            return _held_back(text, eof, "*"), False
+        self.state = _CODE
+        return end + 2, True
+
+    def _string(
+        self, text: str, pos: int, eof: bool, pieces: List[str]
+    ) -> Tuple[int, bool]:
+        m = _STRING_TOKEN.search(text, pos)
+        if m is None:
+            end = _held_back(text, eof, "\\")
+            pieces.append(text[pos:end])
+            return end, False
+        pieces.append(text[pos : m.end()])
+        if m.group() == '"':
+            self.state = _CODE
+        return m.end(), True
+
+
+class _PuzzleSplitter:
+    """Cuts the elements of every top-level array out of comment-free text.
+
+    An element that is a list of numbers is a row, so its array is a puzzle
+    and is yielded once it closes; any other element is a puzzle on its own.
+    """
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_string = False
+        self.parts: List[str] = []
+        self.rows: Puzzle = []
+
+    def feed(self, piece: str) -> Iterator[Puzzle]:
+        pos = 0
+        while pos < len(piece):
+            if self.in_string:
+                pos = self._string(piece, pos)
+                continue
+            token_re = _ELEMENT_TOKEN if self.depth <= 1 else _NESTED_TOKEN
+            m = token_re.search(piece, pos)
+            self._text(piece[pos : len(piece) if m is None else m.start()])
+            if m is None:
+                return
+            pos = m.end()
+            yield from self._token(m.group())
+
+    def finish(self) -> None:
+        if self.depth or self.in_string:
+            raise ValueError("Unexpected end of puzzle file")
+
+    def _string(self, piece: str, pos: int) -> int:
+        m = _STRING_TOKEN.search(piece, pos)
+        end = len(piece) if m is None else m.end()
+        self.parts.append(piece[pos:end])
+        if m is not None and m.group() == '"':
+            self.in_string = False
+        return end
+
+    def _text(self, text: str) -> None:
+        if self.depth:
+            self.parts.append(text)
+        elif text.strip():
+            raise ValueError(_EXPECTED_PUZZLE)
+
+    def _token(self, token: str) -> Iterator[Puzzle]:
+        if token == "[":
+            self._open()
+        elif token == "]":
+            yield from self._close()
+        elif self.depth == 0:
+            raise ValueError(_EXPECTED_PUZZLE)
+        elif token == ",":
+            yield from self._finish_element()
+        else:
+            self.parts.append(token)
+            self.in_string = True
+
+    def _open(self) -> None:
+        if self.depth >= 1:
+            self.parts.append("[")
+        self.depth += 1
+
+    def _close(self) -> Iterator[Puzzle]:
+        self.depth -= 1
+        if self.depth < 0:
+            raise ValueError("Unbalanced brackets")
+        if self.depth >= 1:
+            self.parts.append("]")
+            return
+        yield from self._finish_element()
+        if self.rows:
+            yield list(self.rows)
+            self.rows.clear()
+
+    def _finish_element(self) -> Iterator[Puzzle]:
+        text = "".join(self.parts).strip()
+        self.parts.clear()
+        if not text:
+            return
+        value = json.loads(text)
+        if isinstance(value, list) and all(isinstance(v, int) for v in value):
+            self.rows.append(value)
+        else:
+            yield value
@@ -0,0 +1,142 @@
+import array
+
+
+class RegionIndex:
+    """Label grid of the connected same-value regions of a `FieldState`.
+
+    Every cell, empty ones included, carries the label of its region and every
+    label keeps the set of its cell ids, so "which region holds this cell and
+    how big is it" is a lookup. A changed cell is detached from its region,
+    which is only split when the cells around it lose their connection, and
+    attached to the regions of its new value by relabelling the smaller ones.
+    """
+
+    def __init__(self, field, state):
+        self._field = field
+        self._state = state
+        self._labels = array.array("l", [0]) * field.cells_count()
+        self._members = {}
+        self._next_label = 0
+        self.rebuild()
+
+    def rebuild(self):
+        self._members = {}
+        self._next_label = 0
+        labelled = bytearray(len(self._labels))
+        for cell_id in range(len(self._labels)):
+            if not labelled[cell_id]:
+                members = self._collect(cell_id)
+                self._new_label(members)
+                for member in members:
+                    labelled[member] = 1
+
+    def label(self, cell_id):
+        return self._labels[cell_id]
+
+    def members(self, cell_id):
+        return self._members[self._labels[cell_id]]
+
+    def size(self, cell_id):
+        return len(self._members[self._labels[cell_id]])
+
+    def probe_size(self, cell_id, value):
+        """Size of the region `cell_id` would be part of if set to `value`."""
+        if self._state[cell_id] == value:
+            return self.size(cell_id)
+        labels = {
+            self._labels[n]
+            for n in self._field.get_neighbour_ids(cell_id)
+            if self._state[n] == value
+        }
+        return 1 + sum(len(self._members[label]) for label in labels)
+
+    def detach(self, cell_id):
+        """Removes a cell from its region before its value changes."""
+        label = self._labels[cell_id]
+        members = self._members[label]
+        members.discard(cell_id)
+        if not members:
+            del self._members[label]
+            return
+
+        starts = [n for n in self._field.get_neighbour_ids(cell_id) if n in members]
+        if len(starts) < 2:
+            return
+        first_part = self._search_from(starts, members)
+        if first_part is None:
+            return
+
+        remaining = set(starts) - first_part
+        parts = [first_part]
+        while remaining:
+            part = self._collect(remaining.pop(), members)
+            remaining -= part
+            parts.append(part)
+        parts.sort(key=len)
+        for part in parts[:-1]:
+            members -= part
+            self._new_label(part)
+
+    def attach(self, cell_id):
+        """Adds a cell to the regions of its (already written) value."""
+        value = self._state[cell_id]
+        labels = {
+            self._labels[n]
+            for n in self._field.get_neighbour_ids(cell_id)
+            if self._state[n] == value
+        }
+        if not labels:
+            self._new_label({cell_id})
+            return
+
+        largest = max(labels, key=lambda label: len(self._members[label]))
+        members = self._members[largest]
+        for label in labels - {largest}:
+            merged = self._members.pop(label)
+            for member in merged:
+                self._labels[member] = largest
+            members |= merged
+        members.add(cell_id)
+        self._labels[cell_id] = largest
+
+    def _new_label(self, members):
+        label = self._next_label
+        self._next_label += 1
+        self._members[label] = members
+        for member in members:
+            self._labels[member] = label
+        return label
+
+    def _collect(self, start, within=None):
+        value = self._state[start]
+        found = {start}
+        not_checked = [start]
+        while not_checked:
+            cell_id = not_checked.pop()
+            for n in self._field.get_neighbour_ids(cell_id):
+                if n not in found and (
+                    n in within if within is not None else self._state[n] == value
+                ):
+                    found.add(n)
+                    not_checked.append(n)
+        return found
+
+    def _search_from(self, starts, members):
+        # Breadth-first search from the first start that stops as soon as the
+        # others are reached, which is a few steps unless the region splits.
+        # Returns the whole part of the first start if it got split off.
+        targets = set(starts[1:])
+        found = {starts[0]}
+        frontier = [starts[0]]
+        while frontier:
+            next_frontier = []
+            for cell_id in frontier:
+                for n in self._field.get_neighbour_ids(cell_id):
+                    if n in members and n not in found:
+                        found.add(n)
+                        targets.discard(n)
+                        if not targets:
+                            return None
+                        next_frontier.append(n)
+            frontier = next_frontier
+        return found
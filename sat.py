@@ -0,0 +1,191 @@
+"""Fillomino as a SAT problem, solved with the in-project CDCL solver.
+
+Variable `x(cell, v)` is true when `cell` holds `v`, for `v` from 1 to the
+largest value allowed. The eager part of the encoding is local:
+
+- every cell holds exactly one value and clues are fixed;
+- two neighbouring cells are not both 1, and their values do not differ
+  by one, the rule the backtracking solver adds to Fillomino;
+- a cell holding `v > 1` has a neighbour holding `v`;
+- three connected cells are not all 2.
+
+Region connectivity and sizes are not expressible locally, so they are
+added lazily: every model is checked region by region and each region of
+the wrong size is cut off with a clause that every model containing it
+violates, then the solver runs again with everything it learnt so far.
+
+- A region `R` of value `v` with more than `v` cells contains a connected
+  set `S` of `v + 1` cells, and no solution has all of `S` holding `v`.
+- A region `R` of value `v` with fewer than `v` cells is only part of a
+  solution if one of its cells changes or one of its boundary cells also
+  holds `v`.
+
+Both clauses only rule out invalid boards, so the loop ends with a valid
+board or with a proof that there is none within the allowed values.
+
+An encoding allows values up to the largest clue by default, which keeps
+it small, but an unclued region can be larger. `solve_with_sat` therefore
+widens the values and tries again while the puzzle has no solution within
+them, up to the largest pocket of empty cells, the largest region an
+unclued value can fill.
+"""
+
+import itertools
+
+from cdcl import SatSolver
+from field import region_cells
+
+
+class FillominoEncoding:
+    def __init__(self, field_state, max_value=None):
+        self.field_state = field_state
+        self.field = field_state.field
+        self.cells = list(self.field.get_all_cells())
+        clues = [field_state.get_state(cell) for cell in self.cells]
+        if max_value is None:
+            max_value = max(clues + [2])
+        if max(clues) > max_value:
+            raise ValueError("A clue exceeds the largest allowed value")
+        self.max_value = max_value
+        self.values = range(1, max_value + 1)
+        # Cleared when a SAT call runs out of conflicts, as its None then
+        # proves nothing.
+        self.complete = True
+
+        self.solver = SatSolver()
+        self._vars = {
+            (cell, value): self.solver.new_var()
+            for cell in self.cells
+            for value in self.values
+        }
+        self._encode()
+
+    def var(self, cell, value):
+        return self._vars[cell, value]
+
+    def _encode(self):
+        for cell in self.cells:
+            self._encode_cell(cell)
+            for n in self.field.get_neighbour_cells(cell):
+                if n > cell:
+                    self._encode_neighbours(cell, n)
+            self._encode_growth(cell)
+
+    def _encode_cell(self, cell):
+        add = self.solver.add_clause
+        add([self.var(cell, v) for v in self.values])
+        for a, b in itertools.combinations(self.values, 2):
+            add([-self.var(cell, a), -self.var(cell, b)])
+        clue = self.field_state.get_state(cell)
+        if clue:
+            add([self.var(cell, clue)])
+
+    def _encode_neighbours(self, a, b):
+        add = self.solver.add_clause
+        add([-self.var(a, 1), -self.var(b, 1)])
+        for v in self.values[1:]:
+            add([-self.var(a, v - 1), -self.var(b, v)])
+            add([-self.var(a, v), -self.var(b, v - 1)])
+
+    def _encode_growth(self, cell):
+        add = self.solver.add_clause
+        neighbours = self.field.get_neighbour_cells(cell)
+        for v in self.values[1:]:
+            add([-self.var(cell, v)] + [self.var(n, v) for n in neighbours])
+        if self.max_value >= 2:
+            for a, b in itertools.combinations(neighbours, 2):
+                add([-self.var(a, 2), -self.var(cell, 2), -self.var(b, 2)])
+
+    def solve(self, max_conflicts=None):
+        """Returns the solved board as a list of rows, or None.
+
+        `max_conflicts` bounds every single SAT call; a call that runs out of
+        it also gives None.
+        """
+        while True:
+            result = self.solver.solve(max_conflicts)
+            if not result:
+                self.complete = result is False
+                return None
+            board = self._decode()
+            cuts = self._region_cuts(board)
+            if not cuts:
+                return board
+            for clause in cuts:
+                self.solver.add_clause(clause)
+
+    def _decode(self):
+        size = self.field.size()
+        board = [[0] * size for _ in range(size)]
+        for (cell, value), var in self._vars.items():
+            if self.solver.value(var):
+                board[cell[0]][cell[1]] = value
+        return board
+
+    def _region_cuts(self, board):
+        neighbours = self.field.get_neighbour_cells
+        seen = set()
+        cuts = []
+        for cell in self.cells:
+            if cell in seen:
+                continue
+            value = board[cell[0]][cell[1]]
+            region = region_cells(cell, neighbours, lambda c: board[c[0]][c[1]])
+            seen.update(region)
+            if len(region) > value:
+                # `region_cells` lists cells in search order, so every prefix of
+                # it is connected.
+                cuts.append([-self.var(c, value) for c in region[: value + 1]])
+            elif len(region) < value:
+                members = set(region)
+                boundary = {
+                    n for c in region for n in neighbours(c) if n not in members
+                }
+                cuts.append(
+                    [-self.var(c, value) for c in region]
+                    + [self.var(b, value) for b in boundary]
+                )
+        return cuts
+
+
+def solve_with_sat(field_state, max_value=None, max_conflicts=None):
+    """Solves the puzzle in place; returns False if no solution was found.
+
+    Without `max_value`, the allowed values grow until a solution turns up
+    or none can exist, so False means the puzzle has no solution unless a
+    SAT call ran out of `max_conflicts`. With `max_value`, unclued groups
+    are limited to it.
+    """
+    for bound in _value_bounds(field_state, max_value):
+        encoding = FillominoEncoding(field_state, bound)
+        board = encoding.solve(max_conflicts)
+        if board is not None:
+            for cell in field_state.field.get_all_cells():
+                field_state.set_state(cell, board[cell[0]][cell[1]])
+            return True
+        if not encoding.complete:
+            return False
+    return False
+
+
+def _value_bounds(field_state, max_value):
+    """The largest values to try, doubling from the largest clue."""
+    if max_value is not None:
+        return [max_value]
+    cells = field_state.field.get_all_cells()
+    bound = max([field_state.get_state(cell) for cell in cells] + [2])
+    largest = max([bound] + [len(pocket) for pocket in _pockets(field_state)])
+    bounds = []
+    while bound < largest:
+        bounds.append(bound)
+        bound *= 2
+    return bounds + [largest]
+
+
+def _pockets(field_state):
+    seen = set()
+    for cell in field_state.field.get_all_cells():
+        if field_state.get_state(cell) == 0 and cell not in seen:
+            pocket = field_state.get_involved(cell)
+            seen.update(pocket)
+            yield pocket
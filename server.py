@@ -0,0 +1,477 @@
+"""Asyncio service that solves puzzles sent as JSON lines.
+
+Usage: python server.py [--socket PATH | --port N] [--workers N]
+                        [--queue-size N] [--deadline S] [--max-nodes N]
+                        [--engine ENGINE]
+
+Without `--socket` or `--port`, requests are read from stdin and responses
+written to stdout. Otherwise the service listens on a Unix socket or on a
+TCP port of 127.0.0.1 and serves every client the same way. Each request
+is one line holding a grid in the `puzzle.json` format, or an object
+
+    {"id": "a", "puzzle": [[7, 0, ...], ...], "deadline": 2.5,
+     "max_nodes": 10000}
+
+where `id`, `deadline`, `max_nodes` and `engine` are optional. A request without an
+`id` gets its number on the connection, counting from 0. Puzzles are
+solved on a process pool, and each response is written as soon as its
+puzzle finishes, so responses come in completion order:
+
+    {"id": "a", "status": "solved", "time": 0.12, "latency": 0.31,
+     "solution": [[...], ...]}
+
+`time` is the time spent in the worker, and `latency` is the time since
+the request was read. `status` is one of the statuses of `batch.py`. A
+line that is not a valid request is answered with `error`.
+
+Requests wait in a queue of `--queue-size`. While it is full, no more
+lines are read, so a client that sends faster than the workers solve is
+slowed down instead of filling memory.
+
+A deadline counts from when the request is read, and `--deadline` and
+`--max-nodes` are the defaults. A request still queued at its deadline is
+answered with `timeout` without being run. Otherwise the worker gets the
+rest of the deadline as its timeout and stops its search there, or after
+`max_nodes` search nodes, as in `batch.py`; the response of a search
+stopped early has the board as propagation left it as `"partial"`. A
+worker still busy `KILL_GRACE` seconds later is killed with its pool,
+and the other requests that were running in that pool are started again.
+A request whose pool breaks is retried, and it is answered with
+`crashed` after `MAX_ATTEMPTS` broken pools.
+
+The line `{"stats": true}` is answered at once with the latency
+percentiles of the last `LATENCY_WINDOW` responses, the number of
+responses per status, and the number of requests queued and running.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Awaitable, Callable, Counter, Deque, Dict, List, Optional, Tuple
+
+from batch import (
+    CRASHED,
+    ERROR,
+    KILL_GRACE,
+    TIMEOUT,
+    init_worker,
+    kill_pool,
+    pool_size,
+    solve_one,
+)
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_ENGINE = "backtracking"
+LATENCY_WINDOW = 1000
+PERCENTILES = (50, 90, 99)
+MAX_ATTEMPTS = 3
+# Enough for one line holding a 255x255 board.
+MAX_LINE = 1 << 20
+
+Record = Dict[str, Any]
+Grid = List[List[int]]
+ReadLine = Callable[[], Awaitable[bytes]]
+WriteLine = Callable[[str], Awaitable[None]]
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile of a sorted, non-empty list."""
+    rank = max(1, math.ceil(p / 100 * len(values)))
+    return values[rank - 1]
+
+
+class LatencyTracker:
+    """Latencies of the latest responses, and the responses per status."""
+
+    def __init__(self, window: int = LATENCY_WINDOW) -> None:
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self.statuses: Counter[str] = Counter()
+
+    def add(self, status: str, latency: float) -> None:
+        self._latencies.append(latency)
+        self.statuses[status] += 1
+
+    def summary(self) -> Record:
+        values = sorted(self._latencies)
+        summary: Record = {
+            "responses": sum(self.statuses.values()),
+            "statuses": dict(self.statuses),
+        }
+        if values:
+            for p in PERCENTILES:
+                summary[f"p{p}"] = round(percentile(values, p), 6)
+            summary["max"] = round(values[-1], 6)
+        return summary
+
+
+class Connection:
+    """The response side of one client, and its requests in flight."""
+
+    def __init__(self, write_line: WriteLine) -> None:
+        self._write_line = write_line
+        self._lock = asyncio.Lock()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.pending = 0
+        self.closed = False
+
+    async def send(self, record: Record) -> None:
+        if self.closed:
+            return
+        async with self._lock:
+            try:
+                await self._write_line(json.dumps(record) + "\n")
+            except (ConnectionError, BrokenPipeError):
+                self.closed = True
+
+    def opened_request(self) -> None:
+        self.pending += 1
+        self._idle.clear()
+
+    def closed_request(self) -> None:
+        self.pending -= 1
+        if not self.pending:
+            self._idle.set()
+
+    async def drained(self) -> None:
+        await self._idle.wait()
+
+
+class Request:
+    def __init__(
+        self,
+        request_id: Any,
+        puzzle: Grid,
+        engine: str,
+        deadline: Optional[float],
+        max_nodes: Optional[int],
+        connection: Connection,
+    ) -> None:
+        self.id = request_id
+        self.puzzle = puzzle
+        self.engine = engine
+        self.max_nodes = max_nodes
+        self.connection = connection
+        self.received = time.monotonic()
+        self.deadline = None if deadline is None else self.received + deadline
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+
+class WorkerPool:
+    """A process pool that is replaced when it breaks or has to be killed."""
+
+    def __init__(self, workers: Optional[int]) -> None:
+        self.workers = pool_size(workers)
+        self.executor = self._start()
+        self._killed: "weakref.WeakSet[ProcessPoolExecutor]" = weakref.WeakSet()
+
+    def _start(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker)
+
+    def size(self) -> int:
+        return self.workers
+
+    async def replace(self, executor: ProcessPoolExecutor, kill: bool = False) -> None:
+        """Starts a new pool unless `executor` was already replaced.
+
+        With `kill`, the old pool was still working and is killed on
+        purpose, so the requests it breaks are not blamed for it.
+        """
+        if executor is not self.executor:
+            return
+        if kill:
+            self._killed.add(executor)
+        self.executor = self._start()
+        await asyncio.to_thread(kill_pool, executor)
+
+    def was_killed(self, executor: ProcessPoolExecutor) -> bool:
+        return executor in self._killed
+
+    async def close(self) -> None:
+        await asyncio.to_thread(kill_pool, self.executor)
+
+
+class SolvingService:
+    """Queues the requests of every client and solves them on a pool."""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        deadline: Optional[float] = None,
+        engine: str = DEFAULT_ENGINE,
+        max_nodes: Optional[int] = None,
+    ) -> None:
+        self.pool = WorkerPool(workers)
+        self.queue: "asyncio.Queue[Request]" = asyncio.Queue(queue_size)
+        self.latency = LatencyTracker()
+        self.deadline = deadline
+        self.engine = engine
+        self.max_nodes = max_nodes
+        self.running = 0
+        self._dispatchers: List["asyncio.Task[None]"] = []
+
+    def start(self) -> None:
+        self._dispatchers = [
+            asyncio.create_task(self._dispatch()) for _ in range(self.pool.size())
+        ]
+
+    async def close(self) -> None:
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        await self.pool.close()
+
+    def stats(self) -> Record:
+        summary = self.latency.summary()
+        summary.update(queued=self.queue.qsize(), running=self.running)
+        return summary
+
+    async def serve(self, read_line: ReadLine, write_line: WriteLine) -> None:
+        """Answers one client's requests until it has sent them all."""
+        connection = Connection(write_line)
+        number = 0
+        try:
+            while True:
+                line = await read_line()
+                if not line:
+                    break
+                if line.strip() and await self._receive(line, number, connection):
+                    number += 1
+            await connection.drained()
+        finally:
+            connection.closed = True
+
+    async def _receive(self, line: bytes, number: int, connection: Connection) -> bool:
+        """Queues or answers one line; returns whether it was a request."""
+        try:
+            message = json.loads(line)
+        except ValueError as e:
+            request, error = None, f"Invalid JSON: {e}"
+        else:
+            if isinstance(message, dict) and message.get("stats"):
+                await connection.send(self.stats())
+                return False
+            request, error = self._parse(message, number, connection)
+        if request is None:
+            await connection.send({"id": number, "status": ERROR, "error": error})
+        else:
+            connection.opened_request()
+            await self.queue.put(request)
+        return True
+
+    def _parse(
+        self, message: Any, number: int, connection: Connection
+    ) -> Tuple[Optional[Request], str]:
+        if isinstance(message, list):
+            message = {"puzzle": message}
+        if not isinstance(message, dict):
+            return None, "A request is a grid or an object"
+        puzzle = message.get("puzzle")
+        if not (
+            isinstance(puzzle, list)
+            and puzzle
+            and all(
+                isinstance(row, list)
+                and len(row) == len(puzzle)
+                and all(type(value) is int for value in row)
+                for row in puzzle
+            )
+        ):
+            return None, "The puzzle should be a square grid of integers"
+        deadline = message.get("deadline", self.deadline)
+        if deadline is not None and not isinstance(deadline, (int, float)):
+            return None, "The deadline should be a number of seconds"
+        max_nodes = message.get("max_nodes", self.max_nodes)
+        if max_nodes is not None and type(max_nodes) is not int:
+            return None, "The node limit should be an integer"
+        engine = message.get("engine", self.engine)
+        request_id = message.get("id", number)
+        request = Request(request_id, puzzle, engine, deadline, max_nodes, connection)
+        return request, ""
+
+    async def _dispatch(self) -> None:
+        while True:
+            request = await self.queue.get()
+            try:
+                if request.connection.closed:
+                    continue
+                self.running += 1
+                try:
+                    record = await self._solve(request)
+                finally:
+                    self.running -= 1
+                latency = time.monotonic() - request.received
+                record["latency"] = round(latency, 6)
+                self.latency.add(record["status"], latency)
+                await request.connection.send(record)
+            finally:
+                request.connection.closed_request()
+                self.queue.task_done()
+
+    async def _solve(self, request: Request) -> Record:
+        attempts = 0
+        started = time.monotonic()
+        while True:
+            remaining = request.remaining()
+            if remaining is not None and remaining <= 0:
+                return _record(request, TIMEOUT, started)
+            executor = self.pool.executor
+            started = time.monotonic()
+            try:
+                record = await self._run(executor, request, remaining)
+            except asyncio.TimeoutError:
+                await self.pool.replace(executor, kill=True)
+                return _record(request, TIMEOUT, started)
+            except BrokenProcessPool:
+                killed = self.pool.was_killed(executor)
+                await self.pool.replace(executor)
+                attempts += 0 if killed else 1
+                if attempts >= MAX_ATTEMPTS:
+                    return _record(request, CRASHED, started)
+                continue
+            del record["index"]
+            return {"id": request.id, **record}
+
+    async def _run(
+        self,
+        executor: ProcessPoolExecutor,
+        request: Request,
+        remaining: Optional[float],
+    ) -> Record:
+        """Solves the request on `executor`, waiting at most until the
+        worker should be killed."""
+        future = asyncio.wrap_future(
+            executor.submit(
+                solve_one,
+                0,
+                request.puzzle,
+                request.engine,
+                remaining,
+                False,
+                request.max_nodes,
+            )
+        )
+        if remaining is None:
+            return await future
+        return await asyncio.wait_for(future, remaining + KILL_GRACE)
+
+
+def _record(request: Request, status: str, started: float) -> Record:
+    return {
+        "id": request.id,
+        "status": status,
+        "time": round(time.monotonic() - started, 6),
+    }
+
+
+async def serve_stdio(service: SolvingService) -> None:
+    loop = asyncio.get_running_loop()
+    # One line at a time, so a full queue stops the reading as well.
+    lines: "asyncio.Queue[bytes]" = asyncio.Queue(1)
+
+    def read_stdin() -> None:
+        for line in iter(sys.stdin.buffer.readline, b""):
+            asyncio.run_coroutine_threadsafe(lines.put(line), loop).result()
+        asyncio.run_coroutine_threadsafe(lines.put(b""), loop).result()
+
+    async def write_line(line: str) -> None:
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    # A daemon thread, as a blocked read must not keep the process alive.
+    threading.Thread(target=read_stdin, daemon=True).start()
+    await service.serve(lines.get, write_line)
+
+
+async def serve_socket(
+    service: SolvingService, path: Optional[str], port: Optional[int]
+) -> None:
+    async def handle(
+        reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        async def write_line(line: str) -> None:
+            writer.write(line.encode())
+            await writer.drain()
+
+        try:
+            await service.serve(reader.readline, write_line)
+        except (ConnectionError, ValueError) as e:
+            # ValueError: a line longer than MAX_LINE.
+            print(f"connection dropped: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    if path is not None:
+        server = await asyncio.start_unix_server(handle, path, limit=MAX_LINE)
+    else:
+        server = await asyncio.start_server(handle, "127.0.0.1", port, limit=MAX_LINE)
+    async with server:
+        await server.serve_forever()
+
+
+async def run(args: argparse.Namespace) -> None:
+    service = SolvingService(
+        args.workers, args.queue_size, args.deadline, args.engine, args.max_nodes
+    )
+    service.start()
+    try:
+        if args.socket is None and args.port is None:
+            await serve_stdio(service)
+        else:
+            await serve_socket(service, args.socket, args.port)
+    finally:
+        await service.close()
+        print(json.dumps(service.stats()), file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve puzzle solving requests.")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument("--socket", default=None, help="Unix socket to listen on")
+    where.add_argument(
+        "--port", type=int, default=None, help="TCP port of 127.0.0.1 to listen on"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=None, help="number of worker processes"
+    )
+    parser.add_argument(
+        "-q",
+        "--queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help="requests waiting for a worker before reading pauses",
+    )
+    parser.add_argument(
+        "-d", "--deadline", type=float, default=None, help="default seconds per request"
+    )
+    parser.add_argument(
+        "-n",
+        "--max-nodes",
+        type=int,
+        default=None,
+        help="default search nodes per request",
+    )
+    parser.add_argument("-e", "--engine", default=DEFAULT_ENGINE)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
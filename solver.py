@@ -2,90 +2,75 @@ import collections
 
 from loguru import logger
 
-logger.add("puzzle_solver.log", rotation="50 MB", level="DEBUG")
-
-
-class Field:
-    def __init__(self, size):
-        self.check_size(size)
-        self._size = size
-
-    @staticmethod
-    def check_size(size):
-        if type(size) is not int:
-            raise TypeError("Field size should be an integer")
-
-        if size < 2:
-            raise ValueError("Minimum field size is 2")
-
-    def size(self):
-        return self._size
-
-    def get_all_cells(self):
-        for x in range(self._size):
-            for y in range(self._size):
-                yield x, y
-
-    def get_neighbour_cells(self, cell):
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbour_cell = (cell[0] + dx, cell[1] + dy)
-            if (0 <= neighbour_cell[0] < self._size) and (
-                0 <= neighbour_cell[1] < self._size
-            ):
-                yield neighbour_cell
-
-
-class FieldState:
-    def __init__(self, field):
-        self.field = field
-        self._state = collections.defaultdict(lambda: 0)
-
-    def __str__(self):
-        result = ""
-        for x in range(self.field.size()):
-            row = ""
-            for y in range(self.field.size()):
-                row += str(self._state[(x, y)]) + " "
-            result += row + "\n"
-        return result
-
-    @staticmethod
-    def from_list_to_state(matrix):
-        size = len(matrix)
-        field = Field(size)
-        state = FieldState(field)
-
-        for x in range(size):
-            for y in range(size):
-                state.set_state((x, y), matrix[x][y])
-
-        return state
-
-    def set_state(self, coords, value):
-        if value < 0:
-            raise ValueError("Value should be non-negative")
-
-        if type(value) is not int:
-            raise TypeError("Value should be an integer")
-        self._state[coords] = value
-
-    def get_state(self, coords):
-        return self._state[coords]
-
-    def get_involved(self, cell):
-        involved = [cell]
-        value = self._state[cell]
-        not_checked = [cell]
-
-        while not_checked:
-            cell = not_checked.pop()
+from branching import GROUP, BranchingMixin
+from domains import value_bit
+from field import Field, FieldState  # noqa: F401
+from incremental import IncrementalStateMixin
+from reach import find_reach
+
+LOG_FILE = "puzzle_solver.log"
+TRACE_SAMPLE_EVERY = 100
+TRACE_BUFFER_SIZE = 256
+
+# Nothing is logged until a process asks for it with `configure_logging`.
+logger.disable(__name__)
+
+
+def configure_logging(path=LOG_FILE, level="DEBUG", rotation="50 MB", serialize=False):
+    """Adds a log file sink and enables this module's logging.
+
+    Meant to be called once by every process that should log, workers
+    included; returns the loguru handler id. With `serialize`, records are
+    written as JSON lines with their fields in `extra`.
+    """
+    logger.enable(__name__)
+    return logger.add(path, rotation=rotation, level=level, serialize=serialize)
+
+
+class SearchTrace:
+    """Trace of the backtracking search.
+
+    Every `sample_every`-th node is logged at DEBUG, formatted only if the
+    level is enabled. The last `buffer_size` events are kept unformatted in
+    a ring buffer that is logged as warnings when a solve fails.
+    """
+
+    def __init__(self, sample_every=TRACE_SAMPLE_EVERY, buffer_size=TRACE_BUFFER_SIZE):
+        self.sample_every = sample_every
+        self.events = collections.deque(maxlen=buffer_size)
+
+    def branch(self, solver, depth, alternatives):
+        node = solver.nodes
+        self.events.append(("branch", node, depth, alternatives))
+        if node % self.sample_every == 0:
+            logger.opt(lazy=True).debug(
+                "node {node} depth {depth}: {count} alternatives\n{board}",
+                node=lambda: node,
+                depth=lambda: depth,
+                count=lambda: len(alternatives),
+                board=lambda: str(solver.field_state),
+            )
 
-            for neighbour in self.field.get_neighbour_cells(cell):
-                if neighbour not in involved and self._state[neighbour] == value:
-                    involved.append(neighbour)
-                    not_checked.append(neighbour)
+    def failure(self, solver, depth, cell, value, reason):
+        self.events.append(("failure", solver.nodes, depth, (cell, value, reason)))
 
-        return involved
+    def dump(self, solver, reason):
+        logger.opt(lazy=True).warning(
+            "{reason} after {nodes} nodes, last {count} events:\n{board}",
+            reason=lambda: reason,
+            nodes=lambda: solver.nodes,
+            count=lambda: len(self.events),
+            board=lambda: str(solver.field_state),
+        )
+        for kind, node, depth, detail in self.events:
+            logger.warning(
+                "{kind} node {node} depth {depth}: {detail}",
+                kind=kind,
+                node=node,
+                depth=depth,
+                detail=detail,
+            )
+        self.events.clear()
 
 
 class CellsGroup:
@@ -94,25 +79,11 @@ class CellsGroup:
         self.initial_cells = initial_cells
         self.possible_cells = []
         self.possible_connection_cells = []
+        self.possible_merge_cells = []
 
     def get_value(self):
         return self.value
 
-    def get_possible_len(self):
-        logger.info(f"initial_cells {self.initial_cells}")
-        logger.info(f"possible_cells {self.possible_cells}")
-        logger.info(f"possible_connection_cells {self.possible_connection_cells}")
-        res = (
-            len(self.initial_cells)
-            + len(self.possible_cells)
-            + len(self.possible_connection_cells)
-        )
-        logger.info(
-            f"initial {len(self.initial_cells)} | possible {len(self.possible_cells)} | possible_connection {len(self.possible_connection_cells)} | sum {res}"
-        )
-
-        return res
-
     def get_possible_length(self):
         return (
             len(self.initial_cells)
@@ -125,70 +96,44 @@ class CellsGroup:
             self.possible_cells.append(cell)
 
 
-class PuzzleSolver:
+class PuzzleSolver(IncrementalStateMixin, BranchingMixin):
     possible_values: collections.defaultdict
-    involved: list = []
+    involved: set = set()
     unfilled_groups: dict = {}
+    group_class = CellsGroup
 
-    def __init__(self, field_state):
+    def __init__(self, field_state, incremental=True, branching=GROUP, trace=None):
         self.field_state = field_state
         self.state_changed = True
+        self.incremental = incremental
+        self.branching = branching
+        self.nodes = 0
+        self.trace = trace
 
     def solve(self):
-        self._refresh_state()
-        self._try_fill_empty_cells()
+        try:
+            self._refresh_state()
+            solved = self._try_fill_empty_cells()
+        except Exception as e:
+            if self.trace is not None:
+                self.trace.dump(self, f"{type(e).__name__}: {e}")
+            raise
+        if not solved and self.trace is not None:
+            self.trace.dump(self, "No solution")
+        return solved
 
     def _refresh_state(self):
         self._find_unfilled_groups()
-        for cell in filter(
-            lambda c: self.field_state.get_state(c) != 0 and c in self.unfilled_groups,
-            self.field_state.field.get_all_cells(),
-        ):
-            self._find_possible_values(cell)
-
-        empty_cells = list(
-            filter(
-                lambda c: self.field_state.get_state(c) == 0,
-                self.field_state.field.get_all_cells(),
-            )
-        )
-
-        involved = set()
-        for cell in empty_cells:
-            if all(
-                self.field_state.get_state(n) != 1
-                for n in self.field_state.field.get_neighbour_cells(cell)
-            ):
-                self._add_possible_value(cell, 1)
-
-            if cell not in involved:
-                empty_group = self.field_state.get_involved(cell)
-                involved = involved.union(empty_group)
-                self._find_additional_values(empty_group)
+        for group in dict.fromkeys(self.unfilled_groups.values()):
+            self._find_possible_values(group)
 
+        self._add_cell_sources()
         self.state_changed = True
 
-    def _find_additional_values(self, empty_group):
-        for value in range(2, min(len(empty_group) + 1, 10)):
-            involved_for_value = set(empty_group)
-            not_possible_cells = set()
-
-            for involved in involved_for_value:
-                if any(
-                    self.field_state.get_state(n) == value
-                    for n in self.field_state.field.get_neighbour_cells(involved)
-                ):
-                    not_possible_cells.add(involved)
-            involved_for_value -= not_possible_cells
-
-            if value <= len(involved_for_value):
-                for cell in involved_for_value:
-                    self._add_possible_value(cell, value)
-
     def _find_unfilled_groups(self):
         self.unfilled_groups = {}
-        self.involved = []
-        self.possible_values = collections.defaultdict(lambda: [])
+        self.involved = set()
+        self.possible_values = collections.defaultdict(int)
 
         for cell in filter(
             lambda x: self.field_state.get_state(x) != 0,
@@ -196,7 +141,7 @@ class PuzzleSolver:
         ):
             if cell not in self.involved:
                 initial_cells = self.field_state.get_involved(cell)
-                self.involved += initial_cells
+                self.involved.update(initial_cells)
                 value = self.field_state.get_state(cell)
 
                 if len(initial_cells) < value:
@@ -207,81 +152,59 @@ class PuzzleSolver:
                 if len(initial_cells) > value:
                     raise ValueError("Wrong group size")
 
-    def _find_possible_values(self, cell):
-        next_cells = [(cell, 0)]
-        value = self.field_state.get_state(cell)
-        previous_cells = []
-        group = self.unfilled_groups[cell]
-
-        while next_cells:
-            current_cell, current_length = next_cells.pop()
-            previous_cells.append(current_cell)
-
-            way_length = current_length + len(group.initial_cells)
-
-            if way_length < value and current_cell != cell:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
-
-            elif way_length == value:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
-                continue
-
-            free_neighbours = [
-                neighbour
-                for neighbour in self.field_state.field.get_neighbour_cells(
-                    current_cell
-                )
-                if self.field_state.get_state(neighbour) == 0
-                and neighbour not in previous_cells
-            ]
-            for neighbour in free_neighbours:
-                next_cells.append((neighbour, current_length + 1))
+    def _find_possible_values(self, group):
+        value = group.get_value()
+        reach = find_reach(
+            self.field_state, value, group.initial_cells, connections=False
+        )
+        for cell in reach.distances:
+            self._add_possible_value(cell, value)
+            group.add_possible_cell(cell)
+        return reach.footprint
 
     def _add_possible_value(self, cell, value):
-        if value not in self.possible_values[cell]:
-            invalid_values = set()
-            for n in self.field_state.field.get_neighbour_cells(cell):
-                n_value = self.field_state.get_state(n)
-                if n_value != 0:
-                    invalid_values.add(n_value + 1)  # Adding adjacent values
-                    invalid_values.add(n_value - 1)
-            if value not in invalid_values:
-                self.possible_values[cell].append(value)
+        self._add_possible_values(cell, value_bit(value))
 
     def _try_fill_empty_cells(self):
-
-        def backtrack():
-            # print(self.field_state)
-            if not free_cells:
-                return True
-            cell = free_cells.pop()
-            possible_values[cell] = self.possible_values[cell]
-            logger.info(f"CELL | {cell} | {self.field_state.get_state(cell)}")
-            logger.info(f"POSSIBLE | {possible_values[cell]}")
-            logger.info(f"\n{self.field_state}")
-            for value in possible_values[cell]:
-                self.field_state.set_state(cell, value)
-                try:
-                    self._check_group_size()
-                    if backtrack():
-                        return True
-                except ValueError:
-                    logger.info(f"check_group_size failed value={value}")
-                    pass
-                self.field_state.set_state(cell, 0)
-            free_cells.append(cell)
-            return False
-
-        free_cells = list(
+        free_cells = set(
             filter(
                 lambda c: self.field_state.get_state(c) == 0,
                 self.field_state.field.get_all_cells(),
             )
         )
-        possible_values = self.possible_values
-        backtrack()
+        if self.incremental:
+            self._init_incremental_state()
+        return self._backtrack(free_cells, {})
+
+    def _backtrack(self, free_cells, excluded, depth=0):
+        alternatives = self._choose_branch(free_cells, excluded)
+        if alternatives is None:
+            return True
+        if self.trace is not None:
+            self.trace.branch(self, depth, alternatives)
+        tried = []
+        for cell, value in alternatives:
+            self.nodes += 1
+            if self._branch(free_cells, excluded, cell, value, depth):
+                return True
+            self._exclude(excluded, cell, value)
+            tried.append((cell, value))
+        for cell, value in tried:
+            self._include(excluded, cell, value)
+        return False
+
+    def _branch(self, free_cells, excluded, cell, value, depth):
+        free_cells.discard(cell)
+        try:
+            self._set_cell(cell, value)
+            if self._backtrack(free_cells, excluded, depth + 1):
+                return True
+        except ValueError as e:
+            if self.trace is not None:
+                self.trace.failure(self, depth, cell, value, str(e))
+        self._reset_cell(cell)
+        free_cells.add(cell)
+        return False
 
     def _check_group_size(self):
         self._refresh_state()
@@ -290,13 +213,17 @@ class PuzzleSolver:
             and not group.possible_connection_cells
             for group in self.unfilled_groups.values()
         ):
-            for group in self.unfilled_groups.values():
-                logger.info(
-                    f"group.get_possible_length() < group.get_value() | {group.get_possible_len()} | {group.get_value()} | {group.get_possible_length() < group.get_value()}"
-                )
-                logger.info(
-                    f"possible_connection_cells | {group.possible_connection_cells}"
-                )
+            logger.opt(lazy=True).debug(
+                "Wrong group size, (value, possible length, connections): {groups}",
+                groups=lambda: [
+                    (
+                        group.get_value(),
+                        group.get_possible_length(),
+                        group.possible_connection_cells,
+                    )
+                    for group in dict.fromkeys(self.unfilled_groups.values())
+                ],
+            )
             raise ValueError("Wrong group size")
 
 
@@ -325,8 +252,10 @@ rows_3 = [
     [4, 0, 0, 0, 0, 0],
     [0, 3, 0, 0, 2, 0],
 ]
-state = FieldState.from_list_to_state(rows_2)
-solver = PuzzleSolver(state)
-print(solver.field_state)
-solver.solve()
-print(solver.field_state)
+
+if __name__ == "__main__":
+    state = FieldState.from_list_to_state(rows_2)
+    solver = PuzzleSolver(state)
+    print(solver.field_state)
+    solver.solve()
+    print(solver.field_state)
@@ -1,88 +1,27 @@
 import collections
+import heapq
 import time
 
-
-class Field:
-    def __init__(self, size):
-        self.check_size(size)
-        self._size = size
-
-    @staticmethod
-    def check_size(size):
-        if type(size) is not int:
-            raise TypeError("Field size should be an integer")
-
-        if size < 2:
-            raise ValueError("Minimum field size is 2")
-
-    def size(self):
-        return self._size
-
-    def get_all_cells(self):
-        for x in range(self._size):
-            for y in range(self._size):
-                yield x, y
-
-    def get_neighbour_cells(self, cell):
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            neighbour_cell = (cell[0] + dx, cell[1] + dy)
-            if (0 <= neighbour_cell[0] < self._size) and (
-                0 <= neighbour_cell[1] < self._size
-            ):
-                yield neighbour_cell
-
-
-class FieldState:
-    def __init__(self, field):
-        self.field = field
-        self._state = collections.defaultdict(lambda: 0)
-
-    def __str__(self):
-        result = ""
-        for x in range(self.field.size()):
-            row = ""
-            for y in range(self.field.size()):
-                row += str(self._state[(x, y)]) + " "
-            result += row + "\n"
-        return result
-
-    @staticmethod
-    def from_list_to_state(matrix):
-        size = len(matrix)
-        field = Field(size)
-        state = FieldState(field)
-
-        for x in range(size):
-            for y in range(size):
-                state.set_state((x, y), matrix[x][y])
-
-        return state
-
-    def set_state(self, coords, value):
-        if value < 0:
-            raise ValueError("Value should be non-negative")
-
-        if type(value) is not int:
-            raise TypeError("Value should be an integer")
-        self._state[coords] = value
-
-    def get_state(self, coords):
-        return self._state[coords]
-
-    def get_involved(self, cell):
-        involved = [cell]
-        value = self._state[cell]
-        not_checked = [cell]
-
-        while not_checked:
-            cell = not_checked.pop()
-
-            for neighbour in self.field.get_neighbour_cells(cell):
-                if neighbour not in involved and self._state[neighbour] == value:
-                    involved.append(neighbour)
-                    not_checked.append(neighbour)
-
-        return involved
+import propagation
+from backjumping import ALL_LEVELS, BackjumpingMixin
+from branching import GROUP, BranchingMixin
+from budget import NODE_LIMIT, SOLVED, TIMEOUT, UNSOLVED, BudgetMixin, SolveResult
+from components import DecompositionMixin
+from domains import is_single, lowest_value, value_bit
+from field import Field, FieldState  # noqa: F401
+from incremental import IncrementalStateMixin
+from parallel import ParallelSearchMixin
+from placements import solve_with_placements
+from propagation import Conflict, PropagationMixin, PropagationQueue
+from reach import find_reach
+from sat import solve_with_sat
+from stats import SolverStats
+from transposition import TranspositionMixin
+
+BACKTRACKING = "backtracking"
+SAT = "sat"
+PLACEMENT = "placement"
+ENGINES = (BACKTRACKING, SAT, PLACEMENT)
 
 
 class CellsGroup:
@@ -91,6 +30,7 @@ class CellsGroup:
         self.initial_cells = initial_cells
         self.possible_cells = []
         self.possible_connection_cells = []
+        self.possible_merge_cells = []
 
     def get_value(self):
         return self.value
@@ -110,108 +50,284 @@ class CellsGroup:
         if cell not in self.possible_connection_cells:
             self.possible_connection_cells.append(cell)
 
+    def add_merge_cell(self, cell):
+        if cell not in self.possible_merge_cells:
+            self.possible_merge_cells.append(cell)
 
-class PuzzleSolver:
-    possible_values: collections.defaultdict
-    involved: list = []
-    unfilled_groups: dict = {}
-
-    def __init__(self, field_state):
-        self.field_state = field_state
-        self.state_changed = True
 
-    def solve(self):
-        self._refresh_state()
+class _Search:
+    """The free cells, the exclusions and the solution callback of a search."""
 
-        while self.state_changed:
-            self.state_changed = False
-            self._join_groups_if_one_connection()
-            self._fill_group_if_no_other_variants()
-            self._fill_cells_with_one_value()
+    def __init__(self, free_cells, excluded, on_solution):
+        self.free_cells = free_cells
+        self.excluded = excluded
+        self.on_solution = on_solution
+        self.solving = on_solution is None
 
-        self._try_fill_empty_cells()
 
-    def _fill_cells_with_one_value(self):
-        for cell in filter(
-            lambda c: self.field_state.get_state(c) == 0,
-            self.field_state.field.get_all_cells(),
-        ):
-            if len(self.possible_values[cell]) == 1:
-                self.field_state.set_state(cell, self.possible_values[cell].pop())
+class PuzzleSolver(
+    IncrementalStateMixin,
+    BranchingMixin,
+    PropagationMixin,
+    ParallelSearchMixin,
+    DecompositionMixin,
+    BackjumpingMixin,
+    TranspositionMixin,
+    BudgetMixin,
+):
+    possible_values: collections.defaultdict
+    involved: set = set()
+    unfilled_groups: dict = {}
+    group_class = CellsGroup
+
+    def __init__(
+        self,
+        field_state,
+        incremental=True,
+        branching=GROUP,
+        stats=None,
+        backjumping=True,
+        table=None,
+        vectorized=False,
+    ):
+        self.field_state = field_state
+        self.state_changed = True
+        self.incremental = incremental
+        self.branching = branching
+        self.backjumping = backjumping
+        self.table = table
+        self.vectorized = vectorized
+        self.nodes = 0
+        self.solutions = []
+        self.complete = True
+        self.stats = stats
+        self._queue = PropagationQueue()
+        if stats is not None:
+            stats.attach(self)
+
+    def solve(self, engine=BACKTRACKING, workers=None):
+        """Fills the board in place; returns whether it found a solution.
+
+        The backtracking engine returns False exactly when the board has no
+        solution, including a board whose clues already break the rules,
+        whether or not they fill it.
+
+        Parts of the board that cannot affect each other are searched one
+        after the other, see `components.py`. With `workers`, they are
+        solved in that many processes; a board in one part has its search
+        tree split over them instead, see `parallel.py`. Unless `backjumping`
+        is turned off, a failure sends the sequential search straight back to
+        the deepest decision it depends on, see `backjumping.py`.
+
+        The `sat` engine encodes the puzzle as CNF for the clause-learning
+        solver in `sat.py` instead of searching with the rules below, under
+        the same rules; it widens the values it allows until it finds a
+        solution or proves there is none. The `placement` engine picks whole polyominoes for the clued
+        groups by exact cover under the same rules, see `placements.py`; it
+        is far slower on large boards.
+
+        A `SolverStats` passed to the constructor is filled in along the way
+        and kept in `stats`. A `TranspositionTable` passed as `table` is
+        consulted at every node of the search, see `transposition.py`; it
+        can be shared by solvers of different puzzles. With `vectorized`,
+        the neighbour values of the whole board are found with NumPy when
+        the candidates are rebuilt from the whole board, which the search
+        only does at every node with `incremental=False` and at its leaves,
+        see `vectorized.py`; that needs NumPy.
+        """
+        if self.stats is not None:
+            self.stats.start()
+        try:
+            return self._solve(engine, workers)
+        finally:
+            if self.stats is not None:
+                self.stats.finish(self)
+
+    def _solve(self, engine, workers):
+        if engine == SAT:
+            return solve_with_sat(self.field_state)
+        if engine == PLACEMENT:
+            return solve_with_placements(self.field_state)
+        if engine != BACKTRACKING:
+            raise ValueError(f"Unknown engine {engine!r}")
+
+        rows = self._rows()
+        self._start_budget()
+        if not self._propagate_root():
+            return False
+        components = self._independent_components()
+        if workers is None:
+            return self._solve_components(components)
+        if len(components) > 1:
+            return self._solve_components_parallel(rows, components, workers)
+        solutions = self._search_parallel(rows, workers, limit=1)
+        if solutions:
+            self._paint(solutions[0])
+        return bool(solutions)
+
+    def count_solutions(self, limit=None, max_nodes=None, workers=None):
+        """Number of solutions, stopping as soon as `limit` are found.
+
+        Uses the same rules and pruning as `solve`, so a solution also keeps
+        neighbouring values apart by more than one. The solutions found are
+        kept in `solutions` as lists of rows. After a full count the board is
+        left as propagation before the search left it; after reaching the
+        limit it holds the last solution.
+
+        A search that tries more than `max_nodes` alternatives stops early
+        and sets `complete` to False; the count is then a lower bound.
+        With `workers`, the count runs on that many processes.
+        """
+        self.solutions = []
+        self.complete = True
+        if self.stats is not None:
+            self.stats.start()
+        if workers is not None:
+            self._count_parallel(limit, max_nodes, workers)
+        elif self._propagate_root():
+            self._count_sequential(limit, max_nodes)
+        if self.stats is not None:
+            self.stats.finish(self)
+        return len(self.solutions)
+
+    def _count_parallel(self, limit, max_nodes, workers):
+        rows = self._rows()
+        if not self._propagate_root():
+            return
+        self.solutions = self._search_parallel(rows, workers, limit, max_nodes)
+        if limit is not None and len(self.solutions) >= limit:
+            self._paint(self.solutions[-1])
+
+    def _count_sequential(self, limit, max_nodes):
+        def record_solution():
+            self.solutions.append(self._rows())
+            return limit is not None and len(self.solutions) >= limit
+
+        self._start_budget(max_nodes)
+        try:
+            self._try_fill_empty_cells(record_solution)
+        finally:
+            self._stop_budget()
+
+    def is_unique(self, max_nodes=None, workers=None):
+        """Whether the puzzle has exactly one solution.
+
+        Stops at the second solution; for a puzzle that is not unique the
+        two different solutions are left in `solutions`. A search cut short
+        by `max_nodes` proves nothing, so it gives False as well.
+        """
+        return self.count_solutions(2, max_nodes, workers) == 1 and self.complete
+
+    def solve_within(self, max_nodes=None, deadline=None):
+        """Solves like `solve`, giving up after `max_nodes` search nodes or
+        `deadline` seconds; returns a `SolveResult`.
+
+        A search that runs out of budget stops where it is: the result has
+        the status `NODE_LIMIT` or `TIMEOUT` and the board as propagation
+        left it before the search, which is also painted back. A puzzle
+        without a solution gets that board too, or the board as given when
+        propagation alone finds the contradiction. The deadline counts from
+        the call, but propagation before the search is never cut short.
+        """
+        stats = self.stats if self.stats is not None else SolverStats()
+        stats.start()
+        if deadline is not None:
+            deadline += time.monotonic()
+        self.complete = True
+        rows = self._rows()
+        try:
+            if not self._propagate_root():
+                self._paint(rows)
+                return SolveResult(UNSOLVED, rows, stats)
+            partial = self._rows()
+            self._start_budget(max_nodes, deadline)
+            try:
+                solved = self._solve_components(self._independent_components())
+            finally:
+                self._stop_budget()
+            if solved:
+                return SolveResult(SOLVED, self._rows(), stats)
+            self._paint(partial)
+            if self.stop_reason in (NODE_LIMIT, TIMEOUT):
+                return SolveResult(self.stop_reason, partial, stats)
+            return SolveResult(UNSOLVED, partial, stats)
+        finally:
+            stats.finish(self)
+
+    def _rows(self):
+        size = self.field_state.field.size()
+        return [
+            [self.field_state.get_state((x, y)) for y in range(size)]
+            for x in range(size)
+        ]
+
+    def _paint(self, rows):
+        for x, row in enumerate(rows):
+            for y, value in enumerate(row):
+                self.field_state.set_state((x, y), value)
+
+    def _propagate_root(self):
+        # Finding the groups already raises on one larger than its value.
+        try:
+            if self.incremental:
+                self._init_incremental_state()
+                self._schedule_everything()
+            else:
                 self._refresh_state()
+            self._propagate({}, [], set())
+            self._check_root_groups()
+        except ValueError:
+            return False
+        return True
+
+    def _check_root_groups(self):
+        # The search checks the groups after every cell it sets, which never
+        # happens on a board the clues and deductions already fill.
+        if self.incremental:
+            self._check_incremental_group_size()
+        else:
+            self._check_group_size()
+
+    def _fill_cell_with_one_value(self, cell, excluded):
+        domain = self._domain(cell, excluded)
+        if not domain:
+            raise Conflict("No possible values", reasons=[(propagation.CELL, cell)])
+        if is_single(domain):
+            self._deduce(cell, lowest_value(domain))
+
+    def _join_group_if_one_connection(self, group, excluded):
+        if (
+            group.get_possible_length() < group.get_value()
+            and len(group.possible_connection_cells) == 1
+        ):
+            self._deduce(group.possible_connection_cells[0], group.get_value())
 
-    def _join_groups_if_one_connection(self):
-        for group in self.unfilled_groups.values():
-            if (
-                group.get_possible_length() < group.get_value()
-                and len(group.possible_connection_cells) == 1
-            ):
-                self.field_state.set_state(
-                    group.possible_connection_cells[0], group.get_value()
-                )
-                self._refresh_state()
+    def _fill_group_if_no_other_variants(self, group, excluded):
+        if (
+            group.get_possible_length() == group.get_value()
+            and not group.possible_connection_cells
+        ):
+            for cell in list(group.possible_cells):
+                self._deduce(cell, group.get_value())
 
-    def _fill_group_if_no_other_variants(self):
-        for group in self.unfilled_groups.values():
-            if (
-                group.get_possible_length() == group.get_value()
-                and not group.possible_connection_cells
-            ):
-                for cell in group.possible_cells:
-                    self.field_state.set_state(cell, group.get_value())
-                    self._refresh_state()
+    cell_rules = ("_fill_cell_with_one_value",)
+    group_rules = (
+        "_join_group_if_one_connection",
+        "_fill_group_if_no_other_variants",
+    )
 
     def _refresh_state(self):
         self._find_unfilled_groups()
-        for cell in filter(
-            lambda c: self.field_state.get_state(c) != 0 and c in self.unfilled_groups,
-            self.field_state.field.get_all_cells(),
-        ):
-            self._find_possible_values(cell)
-
-        empty_cells = list(
-            filter(
-                lambda c: self.field_state.get_state(c) == 0,
-                self.field_state.field.get_all_cells(),
-            )
-        )
-
-        involved = set()
-        for cell in empty_cells:
-            if all(
-                self.field_state.get_state(n) != 1
-                for n in self.field_state.field.get_neighbour_cells(cell)
-            ):
-                self._add_possible_value(cell, 1)
-
-            if cell not in involved:
-                empty_group = self.field_state.get_involved(cell)
-                involved = involved.union(empty_group)
-                self._find_additional_values(empty_group)
+        for group in dict.fromkeys(self.unfilled_groups.values()):
+            self._find_possible_values(group)
 
+        self._add_cell_sources()
         self.state_changed = True
 
-    def _find_additional_values(self, empty_group):
-        for value in range(2, min(len(empty_group) + 1, 10)):
-            involved_for_value = set(empty_group)
-            not_possible_cells = set()
-
-            for involved in involved_for_value:
-                if any(
-                    self.field_state.get_state(n) == value
-                    for n in self.field_state.field.get_neighbour_cells(involved)
-                ):
-                    not_possible_cells.add(involved)
-            involved_for_value -= not_possible_cells
-
-            if value <= len(involved_for_value):
-                for cell in involved_for_value:
-                    self._add_possible_value(cell, value)
-
     def _find_unfilled_groups(self):
         self.unfilled_groups = {}
-        self.involved = []
-        self.possible_values = collections.defaultdict(lambda: [])
+        self.involved = set()
+        self.possible_values = collections.defaultdict(int)
 
         for cell in filter(
             lambda x: self.field_state.get_state(x) != 0,
@@ -219,7 +335,7 @@ class PuzzleSolver:
         ):
             if cell not in self.involved:
                 initial_cells = self.field_state.get_involved(cell)
-                self.involved += initial_cells
+                self.involved.update(initial_cells)
                 value = self.field_state.get_state(cell)
 
                 if len(initial_cells) < value:
@@ -228,110 +344,191 @@ class PuzzleSolver:
                         self.unfilled_groups[c] = new_group
 
                 if len(initial_cells) > value:
-                    raise ValueError("Wrong group size")
-
-    def _find_possible_values(self, cell):
-        next_cells = [(cell, 0)]
-        value = self.field_state.get_state(cell)
-        previous_cells = []
-        group = self.unfilled_groups[cell]
-
-        while next_cells:
-            current_cell, current_length = next_cells.pop()
-            previous_cells.append(current_cell)
+                    raise Conflict("Wrong group size", cells=initial_cells)
 
-            way_length = current_length + len(group.initial_cells)
+    def _find_possible_values(self, group):
+        """Adds the reach of `group` to its cells and candidates.
 
-            if way_length < value and current_cell != cell:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
-
-            elif way_length == value:
-                self._add_possible_value(current_cell, value)
-                group.add_possible_cell(current_cell)
+        Returns the cells whose values the reach was found from.
+        """
+        value = group.get_value()
+        reach = find_reach(self.field_state, value, group.initial_cells)
+        for cell in reach.distances:
+            self._add_possible_value(cell, value)
+            group.add_possible_cell(cell)
+        for cell in reach.connections:
+            self._add_possible_value(cell, value)
+            group.add_connection(cell)
+        connections = [
+            (max(len(group.initial_cells) + distance, size), cell)
+            for cell, (distance, size) in reach.connections.items()
+        ]
+        self._find_merge_values(group, connections, reach.footprint)
+        return reach.footprint
+
+    def _find_merge_values(self, group, connections, footprint):
+        # Cells only reachable by merging with another group through a
+        # connection cell can still take the value. The merged group is at
+        # least as large as the path to them, so this never drops one.
+        value = group.get_value()
+        lengths = {cell: length for length, cell in connections}
+        heap = list(connections)
+        heapq.heapify(heap)
+        while heap:
+            length, cell = heapq.heappop(heap)
+            if length > lengths[cell] or length == value:
                 continue
-
-            free_neighbours = filter(
-                lambda n: self.field_state.get_state(n) == 0
-                and n not in previous_cells,
-                self.field_state.field.get_neighbour_cells(current_cell),
-            )
-
-            for neighbour in free_neighbours:
-                if any(
-                    self._connection_cells_found(n, neighbour, group)
-                    for n in self.field_state.field.get_neighbour_cells(neighbour)
-                ):
+            for n in self.field_state.field.get_neighbour_cells(cell):
+                footprint[n] = self.field_state.get_state(n)
+                if footprint[n] != 0:
                     continue
+                n_length = max(
+                    length + 1, self._merged_length(n, group, footprint) or 0
+                )
+                if n_length > value or lengths.get(n, value + 1) <= n_length:
+                    continue
+                lengths[n] = n_length
+                heapq.heappush(heap, (n_length, n))
+                if not (
+                    n in group.possible_cells or n in group.possible_connection_cells
+                ):
+                    group.add_merge_cell(n)
+                    self._add_possible_value(n, value)
 
-                next_cells.append((neighbour, current_length + 1))
-
-    def _connection_cells_found(self, neighbour, cell, group):
+    def _merged_length(self, cell, group, footprint):
+        """Size of the group `cell` joins when set to the group's value, if
+        that merges it with another group; None otherwise."""
         value = group.get_value()
-
-        if (
-            self.field_state.get_state(neighbour) == value
-            and neighbour not in group.initial_cells
-            and neighbour not in group.possible_cells
-        ):
-            self.field_state.set_state(cell, value)
-            intersection_length = len(self.field_state.get_involved(cell))
-            self.field_state.set_state(cell, 0)
-
-            if intersection_length <= value:
-                group.add_connection(cell)
-                self._add_possible_value(cell, value)
-            return True
-
-        return False
+        merges = False
+        for n in self.field_state.field.get_neighbour_cells(cell):
+            footprint[n] = self.field_state.get_state(n)
+            if footprint[n] == value and n not in group.initial_cells:
+                merges = True
+        if merges:
+            return self.field_state.get_probe_size(cell, value)
+        return None
 
     def _add_possible_value(self, cell, value):
-        if value not in self.possible_values[cell]:
-            invalid_values = set()
-            for n in self.field_state.field.get_neighbour_cells(cell):
-                n_value = self.field_state.get_state(n)
-                if n_value != 0:
-                    invalid_values.add(n_value + 1)  # Adding adjacent values
-                    invalid_values.add(n_value - 1)
-            if value not in invalid_values:
-                self.possible_values[cell].append(value)
+        self._add_possible_values(cell, value_bit(value))
 
-    def _try_fill_empty_cells(self):
+    def _try_fill_empty_cells(self, on_solution=None):
+        """Searches for solutions, stopping at the first one by default.
 
-        def backtrack():
-            if not free_cells:
-                return True
-            cell = free_cells.pop()
-            possible_values[cell] = self.possible_values[cell]
-            for value in possible_values[cell]:
-                self.field_state.set_state(cell, value)
-                try:
-                    self._check_group_size()
-                    if backtrack():
-                        return True
-                except ValueError:
-                    pass
-                self.field_state.set_state(cell, 0)
-            free_cells.append(cell)
-            return False
-
-        free_cells = list(
+        With `on_solution`, it is called for every solution instead and the
+        search goes on until it returns True. Once the budget set with
+        `_start_budget` is spent, the search stops where it is, clears
+        `complete` and returns False.
+        """
+        free_cells = set(
             filter(
                 lambda c: self.field_state.get_state(c) == 0,
                 self.field_state.field.get_all_cells(),
             )
         )
-        possible_values = self.possible_values
-        backtrack()
+        if self._scope is not None:
+            free_cells &= self._scope
+        search = _Search(free_cells, {}, on_solution)
+        if self.incremental:
+            self._init_incremental_state()
+        self._start_backjumping()
+        self._start_table()
+        try:
+            return self._backtrack(search) is True and self.stop_reason is None
+        finally:
+            self._stop_backjumping()
+
+    def _backtrack(self, search, depth=0):
+        # True stops the search, anything else is the levels of the failure,
+        # see `backjumping.py`.
+        alternatives = self._choose_branch(search.free_cells, search.excluded)
+        if alternatives is None:
+            return self._leaf(search)
+        reason = self._branch_reason
+        levels = 0
+        tried = []
+        for cell, value in alternatives:
+            if self._count_node(search):
+                return True
+            if self.table is None:
+                failure = self._branch(search, cell, value, depth)
+            else:
+                failure = self._tabled_branch(search, cell, value, depth)
+            if failure is True:
+                return True
+            if not failure >> depth & 1:
+                # Nothing decided here takes part in the failure, so the
+                # other alternatives cannot avoid it either.
+                self.backjumps += 1
+                levels = failure
+                break
+            levels |= failure
+            self._exclude_after(search.excluded, cell, value, failure, depth)
+            tried.append((cell, value))
+        else:
+            levels = (levels | self._branch_levels(reason)) & ~(1 << depth)
+            self._learn(levels)
+        for cell, value in tried:
+            self._include_back(search.excluded, cell, value)
+        return levels
+
+    def _leaf(self, search):
+        if self._breaks_invalid_masks():
+            return ALL_LEVELS
+        return search.on_solution is None or search.on_solution() or ALL_LEVELS
+
+    def _count_node(self, search):
+        """Counts a node of the search; returns True if the budget is spent."""
+        if self.nodes >= self._check_at and self._budget_spent():
+            self.complete = False
+            return True
+        self.nodes += 1
+        if self.stats is not None:
+            self.stats.node(self, search.free_cells, search.excluded)
+        return False
+
+    def _tabled_branch(self, search, cell, value, depth):
+        """`_branch`, answered from the transposition table when it can be."""
+        key = self._table_key(cell, value)
+        failure = self._probe_table(key, depth, search.solving)
+        if failure is not None:
+            return failure
+        start = self.nodes
+        failure = self._branch(search, cell, value, depth)
+        if failure is True:
+            if search.solving:
+                self._record_solution(key)
+            return True
+        self._record_failure(key, failure, self.nodes - start, search.solving)
+        return failure
+
+    def _branch(self, search, cell, value, depth):
+        assigned = [cell]
+        search.free_cells.discard(cell)
+        self._decide(cell, value, depth)
+        try:
+            self._set_cell(cell, value)
+            self._propagate(search.excluded, assigned, search.free_cells)
+            self._check_nogoods(assigned)
+            failure = self._backtrack(search, depth + 1)
+            if failure is True:
+                return True
+        except ValueError as error:
+            if self.stats is not None:
+                self.stats.failure(depth)
+            failure = self._conflict_levels(error)
+        for c in reversed(assigned):
+            self._reset_cell(c)
+            search.free_cells.add(c)
+        return failure
 
     def _check_group_size(self):
         self._refresh_state()
-        if any(
-            group.get_possible_length() < group.get_value()
-            and not group.possible_connection_cells
-            for group in self.unfilled_groups.values()
-        ):
-            raise ValueError("Wrong group size")
+        for group in self.unfilled_groups.values():
+            if (
+                group.get_possible_length() < group.get_value()
+                and not group.possible_connection_cells
+            ):
+                raise Conflict("Wrong group size", reasons=[(propagation.GROUP, group)])
 
 
 # Example usage:
@@ -363,15 +560,10 @@ rows_3 = [
     [4, 0, 0, 0, 0, 0],
     [0, 3, 0, 0, 2, 0],
 ]
-start_time = time.time()
-
-state = FieldState.from_list_to_state(rows_3)
-solver = PuzzleSolver(state)
-print(solver.field_state)
-solver.solve()
-print(solver.field_state)
-
 
-end_time = time.time()
-elapsed_time = end_time - start_time
-print("Time taken to solve the puzzle:", elapsed_time, "seconds")
+if __name__ == "__main__":
+    state = FieldState.from_list_to_state(rows_3)
+    solver = PuzzleSolver(state)
+    print(solver.field_state)
+    solver.solve()
+    print(solver.field_state)
@@ -0,0 +1,131 @@
+"""Counters and timers of a backtracking solve.
+
+A `SolverStats` is handed to `PuzzleSolver` to turn instrumentation on.
+It then wraps the solver's `_refresh_state` and `_update_after_assignment`
+and the board's `get_involved` on the instances, so an uninstrumented solver
+runs the plain methods and its search only pays a `None` check per node.
+
+Every `sample_interval` nodes the total number of candidates left on the
+free cells is sampled, and the hooks get `on_sample`; `on_finish` follows
+the end of a solve. Subclass `StatsHook` to forward the numbers elsewhere.
+The solver's backjumps, nogood hits and transposition table lookups and
+hits are copied when it finishes.
+"""
+
+import collections
+import time
+
+from domains import popcount
+
+DEFAULT_SAMPLE_INTERVAL = 64
+
+
+class StatsHook:
+    def on_sample(self, stats):
+        pass
+
+    def on_finish(self, stats):
+        pass
+
+
+class SolverStats:
+    def __init__(self, hooks=(), sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.hooks = list(hooks)
+        self.sample_interval = sample_interval
+        self.nodes = 0
+        # Alternatives refuted by propagation, by depth in the search tree.
+        self.failures = collections.Counter()
+        self.refresh_calls = 0
+        self.refresh_time = 0.0
+        self.update_calls = 0
+        self.update_time = 0.0
+        self.involved_calls = 0
+        # `(nodes, candidates)` pairs sampled during the search.
+        self.domain_sizes = []
+        self.elapsed = 0.0
+        self.backjumps = 0
+        self.nogood_hits = 0
+        self.table_lookups = 0
+        self.table_hits = 0
+        self._started = None
+
+    def attach(self, solver):
+        if hasattr(solver, "_refresh_state"):
+            solver._refresh_state = self._timed(solver._refresh_state, "refresh")
+        if hasattr(solver, "_update_after_assignment"):
+            solver._update_after_assignment = self._timed(
+                solver._update_after_assignment, "update"
+            )
+        get_involved = solver.field_state.get_involved
+
+        def counted_get_involved(cell):
+            self.involved_calls += 1
+            return get_involved(cell)
+
+        solver.field_state.get_involved = counted_get_involved
+
+    def start(self):
+        self._started = time.perf_counter()
+
+    def node(self, solver, free_cells, excluded):
+        self.nodes = solver.nodes
+        if self.nodes % self.sample_interval:
+            return
+        candidates = sum(
+            popcount(solver._domain(cell, excluded)) for cell in free_cells
+        )
+        self.domain_sizes.append((self.nodes, candidates))
+        for hook in self.hooks:
+            hook.on_sample(self)
+
+    def failure(self, depth):
+        self.failures[depth] += 1
+
+    def finish(self, solver):
+        self.nodes = solver.nodes
+        self.backjumps = getattr(solver, "backjumps", 0)
+        self.nogood_hits = getattr(solver, "nogood_hits", 0)
+        self.table_lookups = getattr(solver, "table_lookups", 0)
+        self.table_hits = getattr(solver, "table_hits", 0)
+        if self._started is not None:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+        for hook in self.hooks:
+            hook.on_finish(self)
+
+    def table_hit_rate(self):
+        if not self.table_lookups:
+            return 0.0
+        return self.table_hits / self.table_lookups
+
+    def as_dict(self):
+        return {
+            "nodes": self.nodes,
+            "failures": dict(sorted(self.failures.items())),
+            "refresh_calls": self.refresh_calls,
+            "refresh_time": round(self.refresh_time, 6),
+            "update_calls": self.update_calls,
+            "update_time": round(self.update_time, 6),
+            "involved_calls": self.involved_calls,
+            "domain_sizes": list(self.domain_sizes),
+            "backjumps": self.backjumps,
+            "nogood_hits": self.nogood_hits,
+            "table_lookups": self.table_lookups,
+            "table_hits": self.table_hits,
+            "table_hit_rate": round(self.table_hit_rate(), 6),
+            "elapsed": round(self.elapsed, 6),
+        }
+
+    def _timed(self, method, name):
+        calls = f"{name}_calls"
+        total = f"{name}_time"
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                setattr(self, total, getattr(self, total) + time.perf_counter() - start)
+                setattr(self, calls, getattr(self, calls) + 1)
+
+        return timed
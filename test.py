@@ -1,24 +1,12 @@
-import json
-import re
-from typing import Dict, List, Tuple
+from reader import iter_puzzles
 
-from matplotlib import pyplot as plt
 
-from constants import NUMBER, PUZZLE_FILE, WALL
-from ui import MasterGraph
-
-
-def read_puzzles(file: str = PUZZLE_FILE) -> List[List[List[int]]]:
-    with open(file, "r", encoding="utf-8") as f:
-        text = f.read()
-    text_wo_comment = re.sub(r"/\*[\s\S]*?\*/|//.*", "", text)
-    jobj = json.loads(text_wo_comment)
-    return jobj
+def run() -> None:
+    from matplotlib import pyplot as plt
 
+    from ui import MasterGraph
 
-def run() -> None:
-    puzzles = read_puzzles()
-    matrix = puzzles[0]
+    matrix = next(iter_puzzles())
     graph = MasterGraph(_rows=len(matrix), _cols=len(matrix[0]))
     graph.set_numbers(matrix)
     graph.draw()
@@ -0,0 +1,90 @@
+"""Solutions of small puzzles by plain enumeration, to check the solvers.
+
+The region of the first empty cell is chosen among all connected sets of
+empty cells of every size, so nothing here shares code with the solvers
+but the grid helpers of `field.py`.
+"""
+
+from field import grid_region, neighbour_cells
+
+
+def is_valid(board):
+    """Whether a full board keeps the rules: every region of equal values
+    has as many cells as its value, and neighbours never differ by one."""
+    size = len(board)
+    cells = [(x, y) for x in range(size) for y in range(size)]
+    if any(board[x][y] < 1 for x, y in cells):
+        return False
+    if any(
+        abs(board[x][y] - board[nx][ny]) == 1
+        for x, y in cells
+        for nx, ny in neighbour_cells((x, y), size)
+    ):
+        return False
+    seen = set()
+    for cell in cells:
+        if cell not in seen:
+            region = grid_region(board, cell)
+            seen.update(region)
+            if len(region) != board[cell[0]][cell[1]]:
+                return False
+    return True
+
+
+def solutions(puzzle):
+    """Every solution of `puzzle`, as lists of rows."""
+    size = len(puzzle)
+    board = [[0] * size for _ in range(size)]
+    found = []
+    _fill(puzzle, board, found)
+    return found
+
+
+def _fill(puzzle, board, found):
+    size = len(board)
+    free = [(x, y) for x in range(size) for y in range(size) if not board[x][y]]
+    if not free:
+        if is_valid(board):
+            found.append([row[:] for row in board])
+        return
+    for value in range(1, len(free) + 1):
+        for region in _regions(puzzle, board, free[0], value):
+            for x, y in region:
+                board[x][y] = value
+            _fill(puzzle, board, found)
+            for x, y in region:
+                board[x][y] = 0
+
+
+def _regions(puzzle, board, start, value):
+    """Connected sets of `value` cells holding `start` that `_fits` allows."""
+    if not _fits(puzzle, board, start, value):
+        return set()
+    found = set()
+    stack = [frozenset([start])]
+    seen = set(stack)
+    while stack:
+        region = stack.pop()
+        if len(region) == value:
+            found.add(region)
+            continue
+        for n in {n for cell in region for n in neighbour_cells(cell, len(board))}:
+            grown = region | {n}
+            if grown not in seen and _fits(puzzle, board, n, value):
+                seen.add(grown)
+                stack.append(grown)
+    return found
+
+
+def _fits(puzzle, board, cell, value):
+    """Whether the empty `cell` can take `value` given its clue and the
+    filled cells and clues around it, which may not be one value away."""
+    x, y = cell
+    if board[x][y] or puzzle[x][y] not in (0, value):
+        return False
+    for nx, ny in neighbour_cells(cell, len(board)):
+        if board[nx][ny] and abs(board[nx][ny] - value) <= 1:
+            return False
+        if puzzle[nx][ny] and abs(puzzle[nx][ny] - value) == 1:
+            return False
+    return True
@@ -0,0 +1,36 @@
+import json
+
+from batch import main
+from validation import is_solution
+
+PUZZLES = [
+    [[0, 3], [0, 0]],
+    [[1, 1], [0, 0]],
+    [[0, 0, 0], [0, 0, 0], [0, 0, 1]],
+]
+
+
+def run(tmp_path, *options):
+    corpus = tmp_path / "puzzles.jsonl"
+    corpus.write_text("\n".join(json.dumps(p) for p in PUZZLES) + "\n")
+    output = tmp_path / "results.jsonl"
+    assert main([str(corpus), "-w", "2", "-o", str(output), *options]) == 0
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    return sorted(records, key=lambda record: record["index"])
+
+
+def test_batch_writes_a_record_per_puzzle(tmp_path):
+    records = run(tmp_path, "-t", "10")
+    assert [r["status"] for r in records] == ["solved", "unsolved", "solved"]
+    for record in records:
+        if record["status"] == "solved":
+            assert is_solution(PUZZLES[record["index"]], record["solution"])
+
+
+def test_batch_answers_again_from_the_cache(tmp_path):
+    cache = str(tmp_path / "solutions.db")
+    run(tmp_path, "-c", cache)
+    records = run(tmp_path, "-c", cache)
+    assert [r.get("cached", False) for r in records] == [True, False, True]
+    records = run(tmp_path, "-c", cache, "-e", "sat")
+    assert not any(r.get("cached", False) for r in records)
@@ -0,0 +1,63 @@
+import pytest
+
+from budget import NODE_LIMIT, SOLVED, TIMEOUT
+from tests.brute_force import is_valid
+from tests.test_solver2 import CORPUS, solver
+
+HARD = CORPUS["15x15-hard"]
+
+
+def propagated(puzzle):
+    puzzle_solver = solver(puzzle)
+    assert puzzle_solver._propagate_root()
+    return puzzle_solver._rows()
+
+
+def keeps_clues(puzzle, board):
+    return all(
+        value == clue
+        for clue_row, row in zip(puzzle, board)
+        for clue, value in zip(clue_row, row)
+        if clue
+    )
+
+
+@pytest.mark.parametrize(
+    "budget, status",
+    [({"max_nodes": 1}, NODE_LIMIT), ({"deadline": 0}, TIMEOUT)],
+)
+def test_stopped_search_restores_the_propagated_board(budget, status):
+    puzzle_solver = solver(HARD)
+    result = puzzle_solver.solve_within(**budget)
+    assert result.status == status
+    assert puzzle_solver.stop_reason == status
+    assert result.board == propagated(HARD)
+    assert keeps_clues(HARD, result.board)
+    assert any(0 in row for row in result.board)
+    assert puzzle_solver._rows() == result.board
+
+
+def test_budget_is_dropped_after_a_stop():
+    puzzle_solver = solver(HARD)
+    assert puzzle_solver.solve_within(max_nodes=1).status == NODE_LIMIT
+    assert puzzle_solver.solve()
+    assert is_valid(puzzle_solver._rows())
+    assert keeps_clues(HARD, puzzle_solver._rows())
+
+
+def test_search_within_budget_is_solved():
+    puzzle_solver = solver(HARD)
+    result = puzzle_solver.solve_within(max_nodes=100000, deadline=60)
+    assert result.status == SOLVED
+    assert is_valid(result.board)
+    assert keeps_clues(HARD, result.board)
+    assert puzzle_solver._rows() == result.board
+
+
+def test_result_as_dict():
+    result = solver(HARD).solve_within(max_nodes=1)
+    record = result.as_dict()
+    assert record["status"] == NODE_LIMIT
+    assert record["board"] == result.board
+    assert record["stats"] == result.stats.as_dict()
+    assert repr(result).startswith("SolveResult('node_limit'")
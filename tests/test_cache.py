@@ -0,0 +1,26 @@
+from cache import SolutionCache
+from validation import is_solution
+
+PUZZLE = [[0, 3], [0, 0]]
+SOLUTION = [[3, 3], [3, 1]]
+
+
+def test_cache_keeps_engines_apart():
+    cache = SolutionCache()
+    cache.put(PUZZLE, SOLUTION, "sat")
+    assert cache.get(PUZZLE, "sat") == SOLUTION
+    assert cache.get(PUZZLE) is None
+
+
+def test_cache_answers_rotated_copies():
+    cache = SolutionCache()
+    cache.put(PUZZLE, SOLUTION)
+    mirrored = [[0, 0], [0, 3]]
+    assert is_solution(mirrored, cache.get(mirrored))
+
+
+def test_is_solution_checks_the_rules():
+    assert is_solution(PUZZLE, SOLUTION)
+    assert not is_solution(PUZZLE, [[3, 3], [3, 2]])
+    assert not is_solution(PUZZLE, [[3, 3], [3, 3]])
+    assert not is_solution([[0, 1], [0, 0]], SOLUTION)
@@ -0,0 +1,77 @@
+import pytest
+
+from tests.brute_force import solutions
+from tests.test_solver2 import solver
+
+# Empty pockets walled off by complete regions, which propagation leaves to
+# the search as separate components.
+POCKETS = [
+    [
+        [0, 0, 0, 1, 0],
+        [0, 0, 9, 0, 0],
+        [1, 9, 9, 9, 0],
+        [0, 0, 9, 9, 9],
+        [0, 0, 9, 9, 1],
+    ],
+    [
+        [0, 1, 7, 0, 0],
+        [0, 7, 7, 0, 0],
+        [0, 0, 7, 7, 0],
+        [2, 7, 7, 0, 1],
+        [2, 0, 0, 0, 0],
+    ],
+    [
+        [0, 0, 8, 8, 1],
+        [0, 0, 8, 8, 8],
+        [0, 8, 8, 0, 0],
+        [1, 0, 8, 0, 0],
+        [0, 0, 1, 0, 0],
+    ],
+]
+# The first board with a clue its pocket cannot fit.
+NO_SOLUTION = [
+    [0, 0, 3, 1, 0],
+    [0, 0, 9, 0, 0],
+    [1, 9, 9, 9, 0],
+    [0, 0, 9, 9, 9],
+    [0, 0, 9, 9, 1],
+]
+
+
+def components(puzzle):
+    puzzle_solver = solver(puzzle)
+    assert puzzle_solver._propagate_root()
+    return puzzle_solver._free_cells(), puzzle_solver._independent_components()
+
+
+@pytest.mark.parametrize("puzzle", POCKETS + [NO_SOLUTION])
+def test_components_split_the_free_cells(puzzle):
+    free_cells, found = components(puzzle)
+    assert len(found) > 1
+    cells = frozenset().union(*found)
+    assert sum(len(component) for component in found) == len(cells)
+    assert free_cells <= cells
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_components_combine_to_a_brute_force_solution(workers):
+    for puzzle in POCKETS:
+        puzzle_solver = solver(puzzle)
+        assert puzzle_solver.solve(workers=workers)
+        assert puzzle_solver._rows() in solutions(puzzle)
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_component_without_solution_fails_the_board(workers):
+    assert not solutions(NO_SOLUTION)
+    assert not solver(NO_SOLUTION).solve(workers=workers)
+    assert solver(NO_SOLUTION).solve_within().status == "unsolved"
+
+
+def test_counts_match_brute_force_across_components():
+    for puzzle in POCKETS:
+        expected = sorted(solutions(puzzle))
+        puzzle_solver = solver(puzzle)
+        assert puzzle_solver.count_solutions() == len(expected)
+        assert sorted(puzzle_solver.solutions) == expected
+        assert solver(puzzle).count_solutions(workers=2) == len(expected)
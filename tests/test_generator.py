@@ -0,0 +1,12 @@
+from generator import generate
+from solver2 import FieldState, PuzzleSolver
+from validation import is_solution
+
+
+def test_generated_puzzle_has_exactly_one_solution():
+    for puzzle, solution in generate(2, size=5, workers=2, seed=1):
+        assert is_solution(puzzle, solution)
+        puzzle_solver = PuzzleSolver(FieldState.from_list_to_state(puzzle))
+        assert puzzle_solver.count_solutions(limit=2) == 1
+        assert puzzle_solver.complete
+        assert puzzle_solver.solutions == [solution]
@@ -0,0 +1,19 @@
+from field import FieldState
+from placements import solve_with_placements
+from tests.brute_force import solutions
+from tests.test_solver2 import random_puzzles
+
+
+def test_placements_find_a_brute_force_solution():
+    for puzzle in random_puzzles(30, 4, 0.5, seed=2):
+        expected = solutions(puzzle)
+        state = FieldState.from_list_to_state(puzzle)
+        assert solve_with_placements(state) == bool(expected)
+        if expected:
+            board = [[state.get_state((x, y)) for y in range(4)] for x in range(4)]
+            assert board in expected
+
+
+def test_placements_reject_clues_that_break_the_rule():
+    puzzle = [[0, 0, 0, 0], [4, 3, 0, 0], [4, 4, 0, 0], [2, 0, 0, 6]]
+    assert not solve_with_placements(FieldState.from_list_to_state(puzzle))
@@ -0,0 +1,27 @@
+import pytest
+
+from reader import iter_puzzles
+
+TEXT = """// Two puzzles in an array
+[
+    [[1, 2], /* a row */ [3, 4]],
+    [[5]]
+]
+[[6], [7]]  // and one on its own line, "//" [
+"""
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 1 << 16])
+def test_iter_puzzles_does_not_depend_on_the_chunks(tmp_path, chunk_size):
+    path = tmp_path / "puzzles.json"
+    path.write_text(TEXT, encoding="utf-8")
+    puzzles = list(iter_puzzles(str(path), chunk_size))
+    assert puzzles == [[[1, 2], [3, 4]], [[5]], [[6], [7]]]
+
+
+@pytest.mark.parametrize("text", ["[[1]", "[[1]]]", "x", '"x"', "[\"]"])
+def test_iter_puzzles_rejects_malformed_files(tmp_path, text):
+    path = tmp_path / "puzzles.json"
+    path.write_text(text, encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_puzzles(str(path), 2))
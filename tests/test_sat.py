@@ -0,0 +1,44 @@
+import pytest
+
+from field import FieldState
+from sat import solve_with_sat
+from tests.brute_force import solutions
+from tests.test_solver2 import random_puzzles
+
+UNCLUED = [
+    [[0, 0, 0], [0, 0, 0], [0, 0, 1]],
+    [[0, 0, 0], [0, 0, 0], [0, 0, 0]],
+    [[1, 0, 0], [0, 0, 0], [0, 0, 0]],
+    [[2, 0, 0], [0, 0, 0], [0, 0, 0]],
+]
+
+
+def sat_solution(puzzle):
+    state = FieldState.from_list_to_state(puzzle)
+    if not solve_with_sat(state):
+        return None
+    size = len(puzzle)
+    return [[state.get_state((x, y)) for y in range(size)] for x in range(size)]
+
+
+@pytest.mark.parametrize(
+    "puzzles",
+    [
+        UNCLUED,
+        list(random_puzzles(10, 3, 0.2, seed=1)),
+        list(random_puzzles(30, 4, 0.5, seed=1)),
+    ],
+)
+def test_sat_finds_a_brute_force_solution(puzzles):
+    for puzzle in puzzles:
+        expected = solutions(puzzle)
+        board = sat_solution(puzzle)
+        assert (board is not None) == bool(expected)
+        if expected:
+            assert board in expected
+
+
+def test_sat_keeps_unclued_groups_within_max_value():
+    state = FieldState.from_list_to_state([[0] * 3 for _ in range(3)])
+    assert solve_with_sat(state, max_value=3)
+    assert max(state.get_state(cell) for cell in state.field.get_all_cells()) <= 3
@@ -0,0 +1,40 @@
+import json
+import os
+import subprocess
+import sys
+
+from benchmark import CORPUS_FILE, load_corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def serve(lines):
+    done = subprocess.run(
+        [sys.executable, "server.py", "--workers", "1"],
+        cwd=ROOT,
+        input="".join(line + "\n" for line in lines),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert done.returncode == 0, done.stderr
+    summary = json.loads(done.stderr.splitlines()[-1])
+    return [json.loads(line) for line in done.stdout.splitlines()], summary
+
+
+def test_stdio_requests_get_their_statuses():
+    hard = load_corpus(os.path.join(ROOT, CORPUS_FILE))[-1]["puzzle"]
+    responses, summary = serve(
+        [
+            json.dumps([[0, 3], [0, 0]]),
+            "not json",
+            json.dumps({"id": "late", "puzzle": hard, "deadline": 0.05}),
+            json.dumps({"puzzle": [[1, 2]]}),
+            json.dumps({"stats": True}),
+        ]
+    )
+    statuses = {r["id"]: r["status"] for r in responses if "id" in r}
+    assert statuses == {0: "solved", 1: "error", "late": "timeout", 3: "error"}
+    stats = [r for r in responses if "id" not in r]
+    assert len(stats) == 1 and "queued" in stats[0]
+    assert summary["statuses"] == {"solved": 1, "timeout": 1}
@@ -0,0 +1,121 @@
+import os
+import random
+
+import pytest
+
+from benchmark import CORPUS_FILE, load_corpus
+from field import FieldState
+from generator import random_solution
+from solver2 import PuzzleSolver
+from tests.brute_force import is_valid, solutions
+from transposition import TranspositionTable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS = {
+    entry["name"]: entry["puzzle"]
+    for entry in load_corpus(os.path.join(ROOT, CORPUS_FILE))
+}
+
+
+def random_puzzles(count, size, clues, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        solution = random_solution(size, rng)
+        yield [
+            [value if rng.random() < clues else 0 for value in row] for row in solution
+        ]
+
+
+def solver(puzzle, **options):
+    return PuzzleSolver(FieldState.from_list_to_state(puzzle), **options)
+
+
+@pytest.mark.parametrize("name", ["10x10-hard", "12x12-hard", "15x15-hard"])
+@pytest.mark.parametrize("incremental", [True, False])
+def test_solve_keeps_neighbours_apart(name, incremental):
+    puzzle_solver = solver(CORPUS[name], incremental=incremental)
+    assert puzzle_solver.solve()
+    assert is_valid(puzzle_solver._rows())
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_solve_finds_a_brute_force_solution(incremental):
+    for puzzle in random_puzzles(30, 4, 0.5):
+        puzzle_solver = solver(puzzle, incremental=incremental)
+        assert puzzle_solver.solve()
+        assert puzzle_solver._rows() in solutions(puzzle)
+
+
+def test_clues_that_break_the_rule_have_no_solution():
+    puzzle = [[0, 0, 0, 0], [4, 3, 0, 0], [4, 4, 0, 0], [2, 0, 0, 6]]
+    assert not solver(puzzle).solve()
+    assert solver(puzzle).count_solutions() == 0
+    assert solver(puzzle).solve_within().status == "unsolved"
+
+
+def test_group_larger_than_its_value_has_no_solution():
+    puzzle = [[1, 1], [0, 0]]
+    for incremental in (True, False):
+        assert not solver(puzzle, incremental=incremental).solve()
+        assert solver(puzzle, incremental=incremental).count_solutions() == 0
+        assert not solver(puzzle, incremental=incremental).is_unique()
+    result = solver(puzzle).solve_within()
+    assert result.status == "unsolved"
+    assert result.board == puzzle
+
+
+@pytest.mark.parametrize("incremental", [True, False])
+def test_full_board_is_only_solved_when_valid(incremental):
+    # The region of 5s on the left has only four cells.
+    invalid = [
+        [7, 7, 7, 4, 4],
+        [7, 7, 7, 4, 4],
+        [5, 5, 7, 2, 2],
+        [5, 3, 3, 5, 5],
+        [5, 3, 5, 5, 5],
+    ]
+    assert not solver(invalid, incremental=incremental).solve()
+    assert solver(invalid, incremental=incremental).count_solutions() == 0
+    valid = next(iter(random_puzzles(1, 5, 1.0)))
+    assert solver(valid, incremental=incremental).solve()
+    assert solver(valid, incremental=incremental).count_solutions() == 1
+
+
+OPTIONS = [
+    {},
+    {"incremental": False},
+    {"backjumping": False},
+    {"branching": "mrv"},
+]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_count_finds_every_brute_force_solution(options):
+    for puzzle in random_puzzles(20, 4, 0.6, seed=1):
+        puzzle_solver = solver(puzzle, **options)
+        expected = sorted(solutions(puzzle))
+        assert puzzle_solver.count_solutions() == len(expected)
+        assert sorted(puzzle_solver.solutions) == expected
+        assert puzzle_solver.complete
+
+
+def test_shared_table_keeps_the_counts():
+    table = TranspositionTable()
+    for puzzle in random_puzzles(20, 4, 0.6, seed=1):
+        expected = solver(puzzle).count_solutions()
+        for _ in range(2):
+            assert solver(puzzle, table=table).count_solutions() == expected
+        assert solver(puzzle, table=table).solve() == bool(expected)
+
+
+def test_parallel_search_matches_the_sequential_one():
+    for puzzle in random_puzzles(3, 5, 0.4, seed=4):
+        sequential = solver(puzzle)
+        count = sequential.count_solutions(50)
+        parallel = solver(puzzle)
+        assert parallel.count_solutions(50, workers=2) == count
+        if count < 50:
+            assert sorted(parallel.solutions) == sorted(sequential.solutions)
+        puzzle_solver = solver(puzzle)
+        assert puzzle_solver.solve(workers=2) == bool(count)
+        assert not count or is_valid(puzzle_solver._rows())
@@ -0,0 +1,117 @@
+from field import zobrist_key
+
+DEAD = "dead"
+SOLVED = "solved"
+DEFAULT_SIZE_BITS = 16
+
+
+class TranspositionTable:
+    """Bounded table of partial boards, keyed by `FieldState.hash`.
+
+    A board is stored as `DEAD` when no solution extends it, or as `SOLVED`
+    with the rows of a solution that does. Both are facts about the board
+    itself under the solver rules, so one table can serve many searches,
+    also of different puzzles with the same size.
+
+    There are `2 ** size_bits` buckets of two slots. The first slot keeps
+    the entry that took the most search nodes to find, the second the most
+    recent one; an entry pushed out of the first slot moves to the second.
+    Only the 64-bit hash is compared, so a false hit is possible but about
+    as likely as the hashes of two given boards being equal.
+    """
+
+    def __init__(self, size_bits=DEFAULT_SIZE_BITS):
+        self._mask = (1 << size_bits) - 1
+        self._kept = [None] * (1 << size_bits)
+        self._recent = [None] * (1 << size_bits)
+
+    def __len__(self):
+        return sum(e is not None for e in self._kept) + sum(
+            e is not None for e in self._recent
+        )
+
+    def lookup(self, key):
+        """`(kind, solution)` stored for `key`, or None."""
+        index = key & self._mask
+        for entry in (self._kept[index], self._recent[index]):
+            if entry is not None and entry[0] == key:
+                return entry[1], entry[2]
+        return None
+
+    def store(self, key, kind, solution=None, cost=0):
+        index = key & self._mask
+        entry = (key, kind, solution, cost)
+        kept = self._kept[index]
+        if kept is None or kept[0] == key or cost >= kept[3]:
+            self._kept[index] = entry
+            if kept is not None and kept[0] != key:
+                self._recent[index] = kept
+        else:
+            self._recent[index] = entry
+
+    def clear(self):
+        self._kept = [None] * len(self._kept)
+        self._recent = [None] * len(self._recent)
+
+
+class TranspositionMixin:
+    """Looks every branch of the search up in a `TranspositionTable`.
+
+    The key of a branch is the hash of the board with the branch's value
+    set and nothing propagated yet, found without touching the board. A
+    dead board fails at once, with the levels of every decision on it, and
+    when solving, a solved board gets the stored solution painted; either
+    way the assignment and its propagation are skipped.
+
+    A branch that fails is stored as dead, unless it may have failed only
+    because solutions counted before were excluded: while counting that is
+    the case unless backjumping knows the levels of the failure. Branches
+    on the way to a solution are stored as solved, except while searching
+    a single component.
+    """
+
+    table = None
+    table_lookups = 0
+    table_hits = 0
+
+    def _start_table(self):
+        self._table_solution = None
+
+    def _table_key(self, cell, value):
+        cell_id = self.field_state.field.cell_id(cell)
+        return self.field_state.hash ^ zobrist_key(cell_id, value)
+
+    def _probe_table(self, key, depth, solving):
+        """None, or what the branch returns instead of being searched."""
+        self.table_lookups += 1
+        entry = self.table.lookup(key)
+        if entry is None:
+            return None
+        kind, solution = entry
+        if kind == DEAD:
+            self.table_hits += 1
+            return (1 << depth + 1) - 1
+        if solving and self._agrees_with(solution):
+            self.table_hits += 1
+            self._paint(solution)
+            return True
+        return None
+
+    def _agrees_with(self, rows):
+        get_state = self.field_state.get_state
+        return all(
+            get_state((x, y)) in (0, value)
+            for x, row in enumerate(rows)
+            for y, value in enumerate(row)
+        )
+
+    def _record_failure(self, key, levels, cost, solving):
+        if solving or levels >= 0:
+            self.table.store(key, DEAD, cost=cost)
+
+    def _record_solution(self, key):
+        if not self.complete or self._scope is not None:
+            return
+        if self._table_solution is None:
+            self._table_solution = self._rows()
+        self.table.store(key, SOLVED, self._table_solution)
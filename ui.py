@@ -1,12 +1,16 @@
-from dataclasses import dataclass, field
-from typing import Dict, List, Tuple
+from __future__ import annotations
 
-import matplotlib.pyplot as plt
-import networkx as nx
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Tuple
 
 from constants import *
 from solver2 import FieldState, PuzzleSolver
 
+# matplotlib and networkx are only imported where they are used, so that
+# importing this module stays cheap for headless solving.
+if TYPE_CHECKING:
+    import networkx as nx
+
 
 @dataclass
 class Graph:
@@ -57,6 +61,9 @@ class Graph:
 
     def draw(self, figsize: Tuple[int, int] = (10, 10)) -> None:
         """Draws the graph."""
+        import matplotlib.pyplot as plt
+        import networkx as nx
+
         fig = plt.figure(figsize=figsize)
         ax = fig.add_subplot()
         ax.invert_yaxis()
@@ -98,6 +105,8 @@ class MasterGraph(Graph):
 
     def _create_matrix(self) -> None:
         """Creates the grid matrix."""
+        import networkx as nx
+
         assert self._rows > 0 and self._cols > 0
         self.graph = nx.grid_2d_graph(self._rows, self._cols)
 
@@ -0,0 +1,53 @@
+"""Checks of a finished board against the rules, independent of any engine.
+
+A board solves a puzzle when it has the puzzle's shape, keeps every clue,
+every region of equal values has as many cells as its value, and no two
+neighbouring cells hold values one apart.
+"""
+
+from typing import Iterator, List, Set, Tuple
+
+from field import grid_region, neighbour_cells
+
+Grid = List[List[int]]
+Cell = Tuple[int, int]
+
+
+def is_solution(puzzle: Grid, board: Grid) -> bool:
+    """Whether `board` is a solution of `puzzle`."""
+    return (
+        _keeps_clues(puzzle, board) and _neighbours_apart(board) and _regions_fit(board)
+    )
+
+
+def _keeps_clues(puzzle: Grid, board: Grid) -> bool:
+    if len(board) != len(puzzle):
+        return False
+    return all(
+        len(row) == len(clues)
+        and all(value > 0 and clue in (0, value) for clue, value in zip(clues, row))
+        for clues, row in zip(puzzle, board)
+    )
+
+
+def _neighbours_apart(board: Grid) -> bool:
+    return all(
+        abs(board[x][y] - board[nx][ny]) != 1
+        for x, y in _cells(board)
+        for nx, ny in neighbour_cells((x, y), len(board))
+    )
+
+
+def _regions_fit(board: Grid) -> bool:
+    seen: Set[Cell] = set()
+    for cell in _cells(board):
+        if cell not in seen:
+            region = grid_region(board, cell)
+            if len(region) != board[cell[0]][cell[1]]:
+                return False
+            seen.update(region)
+    return True
+
+
+def _cells(board: Grid) -> Iterator[Cell]:
+    return ((x, y) for x in range(len(board)) for y in range(len(board)))
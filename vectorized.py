@@ -0,0 +1,42 @@
+"""Neighbour values of the whole board at once, with NumPy.
+
+NumPy is optional: it is only imported when `adjacent_values` is first
+called, so importing this module costs nothing and solvers that do not
+ask for the vectorized path never need it.
+
+The board is viewed as a 2D array without copying. Every filled cell
+becomes the bitset of its value, and the bitsets of the four neighbours
+of all cells are OR-ed together by shifting the whole array one row or
+column at a time, so no Python code runs per cell.
+
+Only the rebuilds of the candidates from the whole board use it: the
+`_refresh_state` that runs at every node with `incremental=False`, and the
+check of the neighbour rule at the leaves of the search. The incremental
+search only updates the cells around an assignment, one at a time, so it
+gains nothing from the vectorized path.
+"""
+
+# The bitset of a value has to fit in an unsigned 64-bit integer.
+MAX_VALUE = 63
+
+
+def adjacent_values(field_state):
+    """Per cell id, the bitset of the values of the cell's neighbours.
+
+    Empty neighbours add nothing. None if a value on the board is too large
+    for a 64-bit bitset.
+    """
+    import numpy as np
+
+    size = field_state.field.size()
+    board = np.frombuffer(field_state.values(), dtype=np.uint16).reshape(size, size)
+    if board.max() > MAX_VALUE:
+        return None
+    bits = np.uint64(1) << board.astype(np.uint64)
+    bits[board == 0] = 0
+    adjacent = np.zeros_like(bits)
+    adjacent[1:] |= bits[:-1]
+    adjacent[:-1] |= bits[1:]
+    adjacent[:, 1:] |= bits[:, :-1]
+    adjacent[:, :-1] |= bits[:, 1:]
+    return adjacent.ravel().tolist()